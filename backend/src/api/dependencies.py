@@ -1,5 +1,4 @@
-from functools import lru_cache
-from typing import AsyncGenerator
+from fastapi import Request
 import redis.asyncio as redis
 import structlog
 
@@ -16,74 +15,55 @@ from src.evaluation.metrics import MetricsCollector
 logger = structlog.get_logger()
 settings = get_settings()
 
+# All heavy dependencies are built once in main.startup_event and stored on
+# app.state; the providers below only hand out those singletons.
+
 # Redis client
-@lru_cache()
-def get_redis_client() -> redis.Redis:
+def get_redis_client(request: Request) -> redis.Redis:
     """Get Redis client"""
-    return redis.from_url(settings.REDIS_URL)
+    return request.app.state.redis
 
 # Vector store
-@lru_cache()
-def get_vector_store() -> VectorStore:
+def get_vector_store(request: Request) -> VectorStore:
     """Get vector store instance"""
-    return VectorStore()
+    return request.app.state.vector_store
 
 # BM25 store
-def get_bm25_store() -> BM25Store:
+def get_bm25_store(request: Request) -> BM25Store:
     """Get BM25 store instance"""
-    redis_client = get_redis_client()
-    return BM25Store(redis_client)
+    return request.app.state.bm25_store
 
 # Reranker
-@lru_cache()
-def get_reranker() -> Reranker:
+def get_reranker(request: Request) -> Reranker:
     """Get reranker instance"""
-    return Reranker()
+    return request.app.state.reranker
 
 # Semantic cache
-def get_semantic_cache() -> SemanticCache:
+def get_semantic_cache(request: Request) -> SemanticCache:
     """Get semantic cache instance"""
-    redis_client = get_redis_client()
-    return SemanticCache(
-        redis_client=redis_client,
-        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
-        ttl=settings.CACHE_TTL,
-    )
+    return request.app.state.cache
 
 # Hybrid retriever
-def get_retriever() -> HybridRetriever:
+def get_retriever(request: Request) -> HybridRetriever:
     """Get hybrid retriever instance"""
-    vector_store = get_vector_store()
-    bm25_store = get_bm25_store()
-    reranker = get_reranker()
-    cache = get_semantic_cache()
-    
-    return HybridRetriever(
-        vector_store=vector_store,
-        bm25_store=bm25_store,
-        reranker=reranker,
-        cache=cache,
-    )
+    return request.app.state.retriever
 
 # LLM generator
-@lru_cache()
-def get_llm() -> LLMGenerator:
+def get_llm(request: Request) -> LLMGenerator:
     """Get LLM generator instance"""
-    return LLMGenerator()
+    return request.app.state.llm
 
 # Document indexer
-def get_indexer() -> DocumentIndexer:
+def get_indexer(request: Request) -> DocumentIndexer:
     """Get document indexer instance"""
-    vector_store = get_vector_store()
-    bm25_store = get_bm25_store()
-    
-    return DocumentIndexer(
-        vector_store=vector_store,
-        bm25_store=bm25_store,
-    )
+    return request.app.state.indexer
+
+# Supported upload extensions
+def get_upload_formats(request: Request) -> frozenset[str]:
+    """Get supported file extensions (lowercase, without the dot)"""
+    return request.app.state.supported_formats
 
 # Metrics collector
-def get_metrics() -> MetricsCollector:
+def get_metrics(request: Request) -> MetricsCollector:
     """Get metrics collector instance"""
-    redis_client = get_redis_client()
-    return MetricsCollector(redis_client)
+    return request.app.state.metrics
@@ -1,19 +1,33 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from prometheus_client import make_asgi_app
+import asyncio
+import contextlib
+import logging
+import redis.asyncio as redis
 import structlog
 import time
 
 from src.core.config import get_settings
 from src.core.logging import setup_logging
 from src.api.routes import query, ingest, metrics, health
+from src.retrieval.vector_store import VectorStore
+from src.retrieval.bm25_store import BM25Store
+from src.retrieval.reranker import Reranker
+from src.retrieval.cache import SemanticCache
+from src.retrieval.hybrid import HybridRetriever
+from src.generation.llm import LLMGenerator
+from src.generation.answer_cache import GroundedAnswerCache
+from src.ingestion.indexer import DocumentIndexer
+from src.evaluation.metrics import MetricsCollector
 
 # Setup
 settings = get_settings()
-setup_logging(settings.LOG_LEVEL)
+log_listener = setup_logging(settings.LOG_LEVEL)
 logger = structlog.get_logger()
+_access_log = logging.getLogger("access")
 
 # FastAPI App
 app = FastAPI(
@@ -22,6 +36,7 @@ app = FastAPI(
     description="Production-grade RAG system with hybrid retrieval and semantic caching",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
 )
 
 # Middleware
@@ -37,19 +52,21 @@ app.add_middleware(GZipMiddleware, minimum_size=1000)
 # Request timing middleware
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
-    start_time = time.perf_counter()
+    start_ns = time.monotonic_ns()
     response = await call_next(request)
-    process_time = time.perf_counter() - start_time
-    response.headers["X-Process-Time"] = f"{process_time:.4f}"
+    dur_ns = time.monotonic_ns() - start_ns
+    if settings.DEBUG:
+        response.headers["X-Process-Time"] = str(dur_ns // 1000) + "us"
     
-    # Log request
-    logger.info(
-        "request_completed",
-        method=request.method,
-        path=request.url.path,
-        duration_ms=process_time * 1000,
-        status_code=response.status_code,
-    )
+    # Log request (plain stdlib logger, formatted lazily off the request path)
+    if _access_log.isEnabledFor(logging.INFO):
+        _access_log.info(
+            "request_completed method=%s path=%s duration_ms=%.3f status_code=%d",
+            request.method,
+            request.url.path,
+            dur_ns / 1_000_000.0,
+            response.status_code,
+        )
     return response
 
 # Exception handler
@@ -61,7 +78,7 @@ async def global_exception_handler(request: Request, exc: Exception):
         error=str(exc),
         exc_info=True,
     )
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error"},
     )
@@ -78,18 +95,74 @@ app.mount("/metrics", metrics_app)
 
 @app.on_event("startup")
 async def startup_event():
+    log_listener.start()
+
+    # Build shared dependencies once; routes read them from app.state
+    app.state.redis_pool = redis.ConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.MAX_CONCURRENT_REQUESTS * 2,
+        decode_responses=False,
+    )
+    app.state.redis = redis.Redis(connection_pool=app.state.redis_pool)
+    app.state.vector_store = VectorStore()
+    app.state.bm25_store = BM25Store(app.state.redis)
+    app.state.reranker = Reranker()
+    app.state.cache = SemanticCache(
+        redis_client=app.state.redis,
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        ttl=settings.CACHE_TTL,
+    )
+    app.state.retriever = HybridRetriever(
+        vector_store=app.state.vector_store,
+        bm25_store=app.state.bm25_store,
+        reranker=app.state.reranker,
+        cache=app.state.cache,
+    )
+    app.state.answer_cache = GroundedAnswerCache(
+        max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+        ttl=settings.CACHE_TTL,
+        similarity_threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        evidence_threshold=settings.ANSWER_CACHE_EVIDENCE_THRESHOLD,
+    ) if settings.ANSWER_CACHE_ENABLED else None
+    app.state.llm = LLMGenerator(answer_cache=app.state.answer_cache)
+    app.state.indexer = DocumentIndexer(
+        vector_store=app.state.vector_store,
+        bm25_store=app.state.bm25_store,
+    )
+    app.state.supported_formats = frozenset(
+        f.lower() for f in app.state.indexer.get_supported_formats()
+    )
+    app.state.metrics = MetricsCollector(app.state.redis)
+    app.state.metrics_task = asyncio.create_task(app.state.metrics.start())
+
     logger.info("application_startup", version=settings.VERSION)
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("application_shutdown")
+    app.state.metrics_task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await app.state.metrics_task
+    app.state.indexer.close()
+    await app.state.vector_store.close()
+    await app.state.redis.aclose()
+    await app.state.redis_pool.disconnect()
+    log_listener.stop()
 
 if __name__ == "__main__":
+    import os
     import uvicorn
     uvicorn.run(
         "src.api.main:app",
         host="0.0.0.0",
         port=8000,
         reload=settings.DEBUG,
+        workers=1 if settings.DEBUG else min(os.cpu_count() or 1, 4),
+        loop="uvloop",
+        http="httptools",
+        limit_concurrency=settings.MAX_CONCURRENT_REQUESTS,
+        backlog=2048,
+        timeout_keep_alive=5,
+        access_log=False,  # Requests are logged by add_process_time_header
         log_config=None,  # Use structlog
     )
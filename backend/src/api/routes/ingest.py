@@ -1,15 +1,19 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends, Request
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
+import orjson
+import os
 import uuid
 import structlog
 
 from src.ingestion.indexer import DocumentIndexer
-from src.api.dependencies import get_indexer
+from src.api.dependencies import get_indexer, get_upload_formats
 
 logger = structlog.get_logger()
 router = APIRouter()
 
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024  # 50MB
+
 class IngestResponse(BaseModel):
     document_id: str
     filename: str
@@ -23,76 +27,82 @@ class DocumentListResponse(BaseModel):
 
 @router.post("/ingest", response_model=IngestResponse)
 async def ingest_document(
+    request: Request,
     file: UploadFile = File(...),
     document_id: Optional[str] = Form(None),
     metadata: Optional[str] = Form(None),  # JSON string
     indexer: DocumentIndexer = Depends(get_indexer),
+    supported_formats: frozenset[str] = Depends(get_upload_formats),
 ):
     """
     Upload and ingest a document
     
     Supported formats: PDF, DOCX, TXT, HTML, MD, and more
     """
-    try:
-        # Validate file type
-        supported_formats = indexer.get_supported_formats()
-        file_extension = file.filename.split('.')[-1].lower()
-        
-        if file_extension not in supported_formats:
+    log = logger.bind(request_id=uuid.uuid4().hex, path=request.url.path, filename=file.filename)
+    
+    # Validate file type
+    file_extension = os.path.splitext(file.filename)[1][1:].lower()
+    
+    if file_extension not in supported_formats:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file format. Supported: {', '.join(sorted(supported_formats))}"
+        )
+    
+    # Parse metadata if provided
+    doc_metadata = {}
+    if metadata:
+        try:
+            doc_metadata = orjson.loads(metadata)
+        except orjson.JSONDecodeError:
             raise HTTPException(
                 status_code=400,
-                detail=f"Unsupported file format. Supported: {', '.join(supported_formats)}"
+                detail="Invalid metadata JSON"
             )
-        
-        # Parse metadata if provided
-        doc_metadata = {}
-        if metadata:
-            import json
-            try:
-                doc_metadata = json.loads(metadata)
-            except json.JSONDecodeError:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Invalid metadata JSON"
-                )
-        
-        # Generate document ID if not provided
-        if not document_id:
-            document_id = str(uuid.uuid4())
-        
-        # Read file content
-        file_bytes = await file.read()
-        
-        # Ingest document
-        logger.info(
-            "ingesting_document",
-            filename=file.filename,
-            document_id=document_id,
-            file_size=len(file_bytes)
+    
+    # Generate document ID if not provided
+    if not document_id:
+        document_id = str(uuid.uuid4())
+    
+    # Measure the spooled upload instead of reading it into memory
+    file.file.seek(0, os.SEEK_END)
+    file_size = file.file.tell()
+    file.file.seek(0)
+    
+    if file_size > MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail="File too large. Maximum size: 50MB"
         )
-        
-        result = await indexer.ingest_bytes(
-            file_bytes=file_bytes,
+    
+    # Ingest document
+    log = log.bind(document_id=document_id)
+    log.info("ingesting_document", file_size=file_size)
+    
+    try:
+        result = await indexer.ingest_stream(
+            file_obj=file.file,
             filename=file.filename,
             document_id=document_id,
             metadata=doc_metadata,
+            mime_type=file.content_type,
         )
-        
-        return IngestResponse(
-            document_id=result["document_id"],
-            filename=file.filename,
-            chunks_processed=result["chunks_processed"],
-            status=result["status"],
-            message="Document ingested successfully"
-        )
-        
-    except Exception as e:
-        logger.error(
-            "ingestion_failed",
-            filename=file.filename,
-            error=str(e)
-        )
-        raise HTTPException(status_code=500, detail=str(e))
+    except ValueError as e:
+        # Unparseable or empty document
+        log.warning("ingestion_rejected", error=str(e))
+        raise HTTPException(status_code=422, detail=str(e))
+    except (TimeoutError, ConnectionError) as e:
+        log.error("ingestion_unavailable", error=str(e))
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return IngestResponse(
+        document_id=result["document_id"],
+        filename=file.filename,
+        chunks_processed=result["chunks_processed"],
+        status=result["status"],
+        message="Document ingested successfully"
+    )
 
 @router.delete("/ingest/{document_id}")
 async def delete_document(
@@ -101,15 +111,9 @@ async def delete_document(
 ):
     """Delete a document from the system"""
     try:
-        result = await indexer.delete_document(document_id)
-        return result
-    except Exception as e:
-        logger.error(
-            "document_deletion_failed",
-            document_id=document_id,
-            error=str(e)
-        )
-        raise HTTPException(status_code=500, detail=str(e))
+        return await indexer.delete_document(document_id)
+    except (TimeoutError, ConnectionError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 @router.get("/ingest/formats")
 async def get_supported_formats(
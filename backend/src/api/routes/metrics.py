@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, Response
 from pydantic import BaseModel
 from typing import Dict, Any, List
+import time
 import structlog
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
@@ -10,6 +11,10 @@ from src.api.dependencies import get_metrics
 logger = structlog.get_logger()
 router = APIRouter()
 
+# Rendered Prometheus exposition, reused for PROMETHEUS_CACHE_SECONDS
+PROMETHEUS_CACHE_SECONDS = 1.0
+_prometheus_cache = (0.0, b"")
+
 class MetricsResponse(BaseModel):
     current: Dict[str, Any]
     history: List[Dict[str, Any]]
@@ -34,8 +39,15 @@ async def get_system_metrics(
 @router.get("/metrics/prometheus")
 async def get_prometheus_metrics():
     """Get Prometheus metrics in OpenMetrics format"""
+    global _prometheus_cache
     try:
-        metrics_data = generate_latest()
+        rendered_at, metrics_data = _prometheus_cache
+        now = time.monotonic()
+        if now - rendered_at > PROMETHEUS_CACHE_SECONDS:
+            # generate_latest() is synchronous, so concurrent scrapes on this
+            # event loop cannot interleave here and no lock is needed
+            metrics_data = generate_latest()
+            _prometheus_cache = (now, metrics_data)
         return Response(
             content=metrics_data,
             media_type=CONTENT_TYPE_LATEST
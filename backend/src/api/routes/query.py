@@ -1,10 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, AsyncIterator
 import asyncio
-import json
+import orjson
 import time
+import uuid
+import structlog
 
 from src.core.config import get_settings
 from src.retrieval.hybrid import HybridRetriever, SearchResult
@@ -13,8 +15,13 @@ from src.generation.citations import extract_citations
 from src.evaluation.metrics import MetricsCollector
 from src.api.dependencies import get_retriever, get_llm, get_metrics
 
+logger = structlog.get_logger()
 router = APIRouter()
 
+# Server-Sent Events framing around each JSON payload
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+
 class QueryRequest(BaseModel):
     query: str = Field(..., min_length=3, max_length=500)
     stream: bool = Field(default=True, description="Stream response")
@@ -37,6 +44,7 @@ class QueryResponse(BaseModel):
 @router.post("/query", response_model=QueryResponse)
 async def query_documents(
     request: QueryRequest,
+    http_request: Request,
     retriever: HybridRetriever = Depends(get_retriever),
     llm: LLMGenerator = Depends(get_llm),
     metrics: MetricsCollector = Depends(get_metrics),
@@ -46,12 +54,14 @@ async def query_documents(
     
     Returns answer with citations and source documents
     """
+    log = logger.bind(request_id=uuid.uuid4().hex, path=http_request.url.path)
     start_time = metrics.record_query_start()
+    recorded = False
     
     try:
         # 1. Retrieve relevant documents
         retrieval_start = time.perf_counter()
-        results = await retriever.retrieve(
+        results, cache_hit = await retriever.retrieve(
             query=request.query,
             top_k=request.top_k * 4,  # Retrieve more, rerank to top_k
             rerank_top_k=request.top_k,
@@ -80,7 +90,8 @@ async def query_documents(
         
         # 4. Prepare response
         total_time = time.perf_counter() - start_time
-        metrics.record_query_end(start_time, cache_hit=(retrieval_time < 0.01))
+        metrics.record_query_end(start_time, cache_hit=cache_hit)
+        recorded = True
         
         return QueryResponse(
             answer=answer,
@@ -94,7 +105,7 @@ async def query_documents(
             ],
             query_id=f"q_{int(time.time())}",
             latency_ms=total_time * 1000,
-            cache_hit=(retrieval_time < 0.01),  # Cached if < 10ms
+            cache_hit=cache_hit,
             metrics={
                 "retrieval_ms": retrieval_time * 1000,
                 "generation_ms": generation_time * 1000,
@@ -103,13 +114,19 @@ async def query_documents(
             }
         )
         
-    except Exception as e:
-        metrics.record_query_end(start_time, cache_hit=False)
-        raise HTTPException(status_code=500, detail=str(e))
+    except (TimeoutError, ConnectionError) as e:
+        log.error("query_unavailable", error=str(e))
+        raise HTTPException(status_code=503, detail=str(e))
+    finally:
+        # HTTPExceptions and unexpected errors propagate as-is (the latter to
+        # the global handler) but still count as a completed query
+        if not recorded:
+            metrics.record_query_end(start_time, cache_hit=False)
 
 @router.post("/query/stream")
 async def query_documents_stream(
     request: QueryRequest,
+    http_request: Request,
     retriever: HybridRetriever = Depends(get_retriever),
     llm: LLMGenerator = Depends(get_llm),
     metrics: MetricsCollector = Depends(get_metrics),
@@ -122,14 +139,15 @@ async def query_documents_stream(
         data: {"type": "token", "content": "text"}
         data: {"type": "done", "latency_ms": 1234}
     """
+    log = logger.bind(request_id=uuid.uuid4().hex, path=http_request.url.path)
     
-    async def generate_stream() -> AsyncIterator[str]:
+    async def generate_stream() -> AsyncIterator[bytes]:
         start_time = metrics.record_query_start()
         
         try:
             # 1. Retrieve and send sources
             retrieval_start = time.perf_counter()
-            results = await retriever.retrieve(
+            results, cache_hit = await retriever.retrieve(
                 query=request.query,
                 top_k=request.top_k,
                 use_cache=request.use_cache,
@@ -148,36 +166,37 @@ async def query_documents_stream(
                     for r in results
                 ],
             }
-            yield f"data: {json.dumps(sources_data)}\n\n"
+            yield _SSE_PREFIX + orjson.dumps(sources_data) + _SSE_SUFFIX
             
             # 2. Stream LLM response
             generation_start = time.perf_counter()
-            answer = ""
             async for token in llm.generate_stream(
                 query=request.query,
                 context_documents=results,
             ):
-                answer += token
                 token_data = {"type": "token", "content": token}
-                yield f"data: {json.dumps(token_data)}\n\n"
+                yield _SSE_PREFIX + orjson.dumps(token_data) + _SSE_SUFFIX
             
             generation_time = time.perf_counter() - generation_start
             metrics.record_generation_time(generation_time)
             
             # 3. Send completion
             total_time = time.perf_counter() - start_time
-            metrics.record_query_end(start_time, cache_hit=(retrieval_time < 0.01))
+            metrics.record_query_end(start_time, cache_hit=cache_hit)
             
             done_data = {
                 "type": "done",
                 "latency_ms": total_time * 1000,
             }
-            yield f"data: {json.dumps(done_data)}\n\n"
+            yield _SSE_PREFIX + orjson.dumps(done_data) + _SSE_SUFFIX
             
         except Exception as e:
+            # Headers are already sent once streaming starts, so every failure
+            # has to be reported in-band as an error event
             metrics.record_query_end(start_time, cache_hit=False)
+            log.error("query_stream_failed", error=str(e))
             error_data = {"type": "error", "message": str(e)}
-            yield f"data: {json.dumps(error_data)}\n\n"
+            yield _SSE_PREFIX + orjson.dumps(error_data) + _SSE_SUFFIX
     
     return StreamingResponse(
         generate_stream(),
@@ -1,5 +1,4 @@
 from pydantic_settings import BaseSettings
-from functools import lru_cache
 
 class Settings(BaseSettings):
     # API Settings
@@ -25,19 +24,31 @@ class Settings(BaseSettings):
     REDIS_REST_TOKEN: str
     CACHE_TTL: int = 3600
     SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_MAX_ENTRIES: int = 1024
+    ANSWER_CACHE_EVIDENCE_THRESHOLD: float = 0.8  # Jaccard overlap of cited chunks
     
     # Database
     DATABASE_URL: str
+    DATABASE_POOL_MIN_SIZE: int = 4
+    DATABASE_POOL_MAX_SIZE: int = 32
+    HNSW_EF_SEARCH: int = 40  # pgvector HNSW candidate list size per query
+    VECTOR_ENCODER_BACKEND: str = "torch"  # "torch" or "onnx" (int8 ONNX Runtime)
+    ONNX_MODEL_DIR: str = ".onnx_models"
+    ONNX_INTRA_OP_THREADS: int = 1
     
     # Retrieval Settings
     TOP_K_RETRIEVAL: int = 20
     TOP_K_RERANK: int = 5
     CHUNK_SIZE: int = 512
     CHUNK_OVERLAP: int = 128
+    BM25_CACHE_DIR: str = ".bm25_cache"  # Local mmap snapshots of the BM25 index
     
     # Performance
     MAX_CONCURRENT_REQUESTS: int = 100
     TIMEOUT_SECONDS: int = 30
+    INGEST_CONCURRENCY: int = 8  # Documents parsed at once by batch ingestion
+    SEED_EMBED_BACKEND: str = "auto"  # "fp32", "bf16", "int8", or "auto" (bf16 on GPU, int8 if installed)
     
     # Monitoring
     PROMETHEUS_PORT: int = 9090
@@ -50,6 +61,8 @@ class Settings(BaseSettings):
         env_file = ".env"
         case_sensitive = True
 
-@lru_cache
+# Settings are read once at import and never mutated
+SETTINGS = Settings()
+
 def get_settings() -> Settings:
-    return Settings()
+    return SETTINGS
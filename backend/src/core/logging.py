@@ -1,17 +1,54 @@
 import structlog
 import logging
+import logging.handlers
+import queue
 import sys
 
-def setup_logging(log_level: str = "INFO"):
-    """Setup structured logging with structlog"""
-    
-    # Configure standard logging
-    logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
-        level=getattr(logging, log_level.upper()),
+class _EventQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records untouched so rendering happens on the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def setup_logging(log_level: str = "INFO") -> logging.handlers.QueueListener:
+    """
+    Setup structured logging with structlog
+
+    Request-path log calls only run the cheap structlog processors and push
+    the event dict onto an in-memory queue. JSON rendering and the write to
+    stdout happen in a QueueListener thread.
+
+    Returns:
+        The (not yet started) QueueListener; start it on app startup and
+        stop it on shutdown so queued records are flushed.
+    """
+
+    # Renderer runs on the listener thread
+    formatter = structlog.stdlib.ProcessorFormatter(
+        processors=[
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            structlog.processors.UnicodeDecoder(),
+            structlog.processors.JSONRenderer(),
+        ],
+        foreign_pre_chain=[
+            structlog.stdlib.add_logger_name,
+            structlog.stdlib.add_log_level,
+            structlog.processors.TimeStamper(fmt="iso"),
+        ],
+    )
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
     )
-    
+
+    # Configure standard logging: the queue is the only root handler
+    root = logging.getLogger()
+    root.handlers = [_EventQueueHandler(log_queue)]
+    root.setLevel(getattr(logging, log_level.upper()))
+
     # Configure structlog
     structlog.configure(
         processors=[
@@ -22,11 +59,12 @@ def setup_logging(log_level: str = "INFO"):
             structlog.processors.TimeStamper(fmt="iso"),
             structlog.processors.StackInfoRenderer(),
             structlog.processors.format_exc_info,
-            structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer()
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
         ],
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=structlog.stdlib.BoundLogger,
         cache_logger_on_first_use=True,
     )
+
+    return listener
@@ -1,6 +1,9 @@
 from typing import Dict, List, Any
+from datetime import datetime
+import asyncio
 import time
 import numpy as np
+import orjson
 from prometheus_client import Counter, Histogram, Gauge
 import redis.asyncio as redis
 import structlog
@@ -18,12 +21,25 @@ TOKEN_USAGE = Counter("rag_tokens_total", "Total tokens used", ["model", "type"]
 COST_TRACKER = Counter("rag_cost_total", "Total cost in USD", ["service"])
 DOCUMENTS_INDEXED = Gauge("rag_documents_indexed", "Number of documents indexed")
 
+# Latency percentiles are computed over the most recent queries only
+LATENCY_WINDOW = 8192  # Must be a power of two
+
+# Per-hour latency buckets kept for the dashboard chart
+HISTORY_HOURS = 24
+
 class MetricsCollector:
     """Collect and track system metrics"""
     
     def __init__(self, redis_client: redis.Redis):
         self.redis = redis_client
-        self.query_times = []
+        self._times = np.empty(LATENCY_WINDOW, dtype=np.float64)
+        self._idx = 0  # Total queries recorded; write slot is _idx % LATENCY_WINDOW
+        # Bucket slot is (hours since epoch) % HISTORY_HOURS; _hourly_epoch
+        # holds the hour each slot was last written so stale slots can reset
+        self._hourly_epoch = np.full(HISTORY_HOURS, -1, dtype=np.int64)
+        self._hourly_max = np.zeros(HISTORY_HOURS, dtype=np.float32)
+        self._hourly_sum = np.zeros(HISTORY_HOURS, dtype=np.float64)
+        self._hourly_count = np.zeros(HISTORY_HOURS, dtype=np.int32)
         self.cache_hits = 0
         self.cache_misses = 0
     
@@ -37,7 +53,20 @@ class MetricsCollector:
         QUERY_LATENCY.observe(duration)
         QUERY_COUNTER.inc()
         
-        self.query_times.append(duration)
+        self._times[self._idx & (LATENCY_WINDOW - 1)] = duration
+        self._idx += 1
+        
+        hour = int(time.time()) // 3600
+        slot = hour % HISTORY_HOURS
+        if self._hourly_epoch[slot] != hour:
+            self._hourly_epoch[slot] = hour
+            self._hourly_max[slot] = 0.0
+            self._hourly_sum[slot] = 0.0
+            self._hourly_count[slot] = 0
+        if duration > self._hourly_max[slot]:
+            self._hourly_max[slot] = duration
+        self._hourly_sum[slot] += duration
+        self._hourly_count[slot] += 1
         
         if cache_hit:
             CACHE_HIT_COUNTER.inc()
@@ -45,9 +74,6 @@ class MetricsCollector:
         else:
             CACHE_MISS_COUNTER.inc()
             self.cache_misses += 1
-        
-        # Store in Redis for dashboard
-        asyncio.create_task(self._store_metrics())
     
     def record_retrieval_time(self, duration: float):
         """Record retrieval latency"""
@@ -77,11 +103,12 @@ class MetricsCollector:
     async def get_metrics_summary(self) -> Dict[str, Any]:
         """Get current metrics summary"""
         try:
-            # Calculate percentiles
-            if self.query_times:
-                p50 = np.percentile(self.query_times, 50)
-                p95 = np.percentile(self.query_times, 95)
-                p99 = np.percentile(self.query_times, 99)
+            # Calculate percentiles (O(n) selection instead of a full sort)
+            n = min(self._idx, LATENCY_WINDOW)
+            if n:
+                ranks = [min(int(n * q), n - 1) for q in (0.50, 0.95, 0.99)]
+                window = np.partition(self._times[:n], ranks)
+                p50, p95, p99 = (float(window[r]) for r in ranks)
             else:
                 p50 = p95 = p99 = 0
             
@@ -111,35 +138,53 @@ class MetricsCollector:
             logger.error("metrics_collection_failed", error=str(e))
             return {}
     
+    async def start(self, interval: float = 1.0):
+        """
+        Flush metrics to Redis every `interval` seconds
+        
+        Run as a background task; cancel it to stop flushing.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            await self._store_metrics()
+    
     async def _store_metrics(self):
         """Store metrics in Redis for dashboard"""
         try:
             metrics = await self.get_metrics_summary()
-            await self.redis.setex(
-                "current_metrics",
-                60,  # 1 minute TTL
-                str(metrics)
-            )
+            hourly = await self.get_latency_history()
+            # One round-trip for all keys
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.setex(
+                    "current_metrics",
+                    60,  # 1 minute TTL
+                    orjson.dumps(metrics, option=orjson.OPT_SERIALIZE_NUMPY)
+                )
+                pipe.setex("current_hourly", 60, orjson.dumps(hourly))
+                await pipe.execute()
         except Exception as e:
             logger.error("metrics_storage_failed", error=str(e))
     
-    async def get_latency_history(self, hours: int = 24) -> List[Dict[str, Any]]:
-        """Get latency history for charts"""
-        # In a real implementation, this would query a time-series database
-        # For now, return mock data
-        import random
-        from datetime import datetime, timedelta
+    async def get_latency_history(self, hours: int = HISTORY_HOURS) -> List[Dict[str, Any]]:
+        """
+        Get latency history for charts, oldest hour first
         
-        history = []
-        now = datetime.now()
+        Built from the hourly buckets updated in record_query_end. Only the
+        max and mean are tracked per hour, so p95_latency is the hourly max
+        (an upper bound) and p50_latency the hourly mean.
+        """
+        hours = min(hours, HISTORY_HOURS)
+        now_hour = int(time.time()) // 3600
         
-        for i in range(hours):
-            timestamp = now - timedelta(hours=i)
+        history = []
+        for hour in range(now_hour - hours + 1, now_hour + 1):
+            slot = hour % HISTORY_HOURS
+            count = int(self._hourly_count[slot]) if self._hourly_epoch[slot] == hour else 0
             history.append({
-                "time": timestamp.strftime("%H:%M"),
-                "p95_latency": random.uniform(150, 250),
-                "p50_latency": random.uniform(80, 120),
-                "queries": random.randint(10, 50),
+                "time": datetime.fromtimestamp(hour * 3600).strftime("%H:%M"),
+                "p95_latency": float(self._hourly_max[slot]) * 1000 if count else 0.0,
+                "p50_latency": float(self._hourly_sum[slot]) / count * 1000 if count else 0.0,
+                "queries": count,
             })
         
-        return list(reversed(history))
+        return history
@@ -0,0 +1,158 @@
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional
+import numpy as np
+import structlog
+
+from src.retrieval.hybrid import SearchResult
+from src.utils.embeddings import get_embedding
+
+logger = structlog.get_logger()
+
+def _evidence_id(doc: SearchResult) -> str:
+    """Stable identifier for a context chunk"""
+    if doc.doc_uid:
+        return doc.doc_uid
+    return hashlib.sha1(doc.content.encode()).hexdigest()
+
+@dataclass
+class CacheEntry:
+    answer: str
+    query_embedding: np.ndarray  # L2-normalized
+    evidence: FrozenSet[str]
+    versions: Dict[str, Optional[str]]  # evidence id -> ingested_at
+    created_at: float
+    hits: int = 0
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+@dataclass
+class _Evidence:
+    ids: FrozenSet[str]
+    versions: Dict[str, Optional[str]]
+
+class GroundedAnswerCache:
+    """
+    In-process answer cache validated against the retrieved evidence
+
+    A cached answer is reused only when all of the following hold:
+    - G1: the query embedding is close to the cached one (cosine > threshold)
+    - G2: the retrieved chunks overlap the cached ones (Jaccard > threshold)
+    - G3: every shared chunk has the same ingested_at version
+
+    Entries are kept in LRU order with a TTL. The query embedding is only
+    computed when some entry already passes G2 and G3.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: int = 3600,
+        similarity_threshold: float = 0.95,
+        evidence_threshold: float = 0.8,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.evidence_threshold = evidence_threshold
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.stats = CacheStats()
+
+    @staticmethod
+    def _evidence(documents: List[SearchResult]) -> _Evidence:
+        versions = {_evidence_id(doc): doc.metadata.get("ingested_at") for doc in documents}
+        return _Evidence(ids=frozenset(versions), versions=versions)
+
+    @staticmethod
+    def _key(query: str, evidence: _Evidence) -> str:
+        digest = hashlib.sha1(" ".join(query.lower().split()).encode())
+        for evidence_id in sorted(evidence.ids):
+            digest.update(b"\0" + evidence_id.encode())
+        return digest.hexdigest()
+
+    def _evidence_matches(self, entry: CacheEntry, evidence: _Evidence) -> bool:
+        shared = entry.evidence & evidence.ids
+        union = len(entry.evidence) + len(evidence.ids) - len(shared)
+        if not union or len(shared) / union <= self.evidence_threshold:
+            return False
+        return all(entry.versions[i] == evidence.versions[i] for i in shared)
+
+    def _expire(self, now: float):
+        # Insertion refreshes LRU order, so the oldest entries are not
+        # necessarily first; a full sweep is cheap at this size
+        expired = [k for k, e in self._entries.items() if now - e.created_at > self.ttl]
+        for key in expired:
+            del self._entries[key]
+        self.stats.expirations += len(expired)
+
+    async def get(self, query: str, documents: List[SearchResult]) -> Optional[str]:
+        """Return a cached answer grounded in the same evidence, if any"""
+        now = time.monotonic()
+        self._expire(now)
+        evidence = self._evidence(documents)
+
+        # Exact query over the same chunks: no embedding needed
+        key = self._key(query, evidence)
+        entry = self._entries.get(key)
+        if entry is not None and self._evidence_matches(entry, evidence):
+            return self._hit(key, entry)
+
+        candidates = [
+            (k, e) for k, e in self._entries.items() if self._evidence_matches(e, evidence)
+        ]
+        if candidates:
+            query_embedding = await self._embed(query)
+            best_key, best_entry, best_similarity = None, None, self.similarity_threshold
+            for k, e in candidates:
+                similarity = float(np.dot(query_embedding, e.query_embedding))
+                if similarity > best_similarity:
+                    best_key, best_entry, best_similarity = k, e, similarity
+            # Entries may have been evicted while awaiting the embedding
+            if best_entry is not None and best_key in self._entries:
+                return self._hit(best_key, best_entry)
+
+        self.stats.misses += 1
+        return None
+
+    async def set(self, query: str, documents: List[SearchResult], answer: str):
+        """Cache an answer together with the evidence it was generated from"""
+        evidence = self._evidence(documents)
+        key = self._key(query, evidence)
+        query_embedding = await self._embed(query)
+
+        self._entries[key] = CacheEntry(
+            answer=answer,
+            query_embedding=query_embedding,
+            evidence=evidence.ids,
+            versions=evidence.versions,
+            created_at=time.monotonic(),
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def _hit(self, key: str, entry: CacheEntry) -> str:
+        self._entries.move_to_end(key)
+        entry.hits += 1
+        self.stats.hits += 1
+        logger.debug("answer_cache_hit", hits=entry.hits, hit_rate=self.stats.hit_rate)
+        return entry.answer
+
+    @staticmethod
+    async def _embed(query: str) -> np.ndarray:
+        embedding = np.asarray(await get_embedding(query), dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
@@ -2,6 +2,9 @@ import re
 from typing import List, Dict, Any, Tuple
 from src.retrieval.hybrid import SearchResult
 
+# Citation markers like [Document 1], [Document 2], etc.
+_CITATION_RE = re.compile(r'\[Document (\d+)\]')
+
 def extract_citations(answer: str, documents: List[SearchResult]) -> List[Dict[str, Any]]:
     """
     Extract and format citations from answer
@@ -14,26 +17,25 @@ def extract_citations(answer: str, documents: List[SearchResult]) -> List[Dict[s
         List of citation objects with metadata
     """
     citations = []
+    seen = set()  # Each document is cited once, however often it is mentioned
     
-    # Find all citation patterns like [Document 1], [Document 2], etc.
-    citation_pattern = r'\[Document (\d+)\]'
-    matches = re.findall(citation_pattern, answer)
-    
-    for doc_num in matches:
-        try:
-            doc_index = int(doc_num) - 1  # Convert to 0-based index
-            if 0 <= doc_index < len(documents):
-                doc = documents[doc_index]
-                citation = {
-                    "document_number": int(doc_num),
-                    "content": doc.content[:200] + "..." if len(doc.content) > 200 else doc.content,
-                    "metadata": doc.metadata,
-                    "relevance_score": doc.score,
-                    "source": doc.source,
-                }
-                citations.append(citation)
-        except (ValueError, IndexError):
+    for match in _CITATION_RE.finditer(answer):
+        # The pattern only captures digits, so int() cannot fail
+        doc_num = int(match.group(1))
+        doc_index = doc_num - 1  # Convert to 0-based index
+        if doc_index in seen or not 0 <= doc_index < len(documents):
             continue
+        seen.add(doc_index)
+        
+        doc = documents[doc_index]
+        content = doc.content
+        citations.append({
+            "document_number": doc_num,
+            "content": content if len(content) <= 200 else content[:200] + "...",
+            "metadata": doc.metadata,
+            "relevance_score": doc.score,
+            "source": doc.source,
+        })
     
     return citations
 
@@ -42,13 +44,15 @@ def format_citations(citations: List[Dict[str, Any]]) -> str:
     if not citations:
         return ""
     
-    formatted = "\n\n**Sources:**\n"
+    lines = []
     for citation in citations:
-        source = citation["metadata"].get("source", "Unknown")
-        page = citation["metadata"].get("page", "N/A")
-        formatted += f"- [Document {citation['document_number']}] {source} (Page {page})\n"
+        metadata = citation["metadata"]
+        lines.append(
+            f"- [Document {citation['document_number']}] "
+            f"{metadata.get('source', 'Unknown')} (Page {metadata.get('page', 'N/A')})"
+        )
     
-    return formatted
+    return "\n\n**Sources:**\n" + "\n".join(lines) + "\n"
 
 def add_citations_to_answer(answer: str, documents: List[SearchResult]) -> Tuple[str, List[Dict[str, Any]]]:
     """
@@ -1,10 +1,11 @@
-from typing import List, AsyncIterator
+from typing import List, AsyncIterator, Optional
 import google.generativeai as genai
 import structlog
 
 from src.core.config import get_settings
 from src.retrieval.hybrid import SearchResult
 from src.generation.prompts import build_rag_prompt
+from src.generation.answer_cache import GroundedAnswerCache
 
 logger = structlog.get_logger()
 
@@ -17,13 +18,15 @@ class LLMGenerator:
     - Citation-aware prompts
     - Retry logic
     - Cost tracking
+    - Optional evidence-validated answer cache
     """
     
-    def __init__(self):
+    def __init__(self, answer_cache: Optional[GroundedAnswerCache] = None):
         settings = get_settings()
         genai.configure(api_key=settings.GOOGLE_AI_API_KEY)
         self.model = genai.GenerativeModel(settings.LLM_MODEL)
         self.max_tokens = 2000
+        self.answer_cache = answer_cache
     
     async def generate(
         self,
@@ -33,6 +36,13 @@ class LLMGenerator:
     ) -> str:
         """Generate answer from query and context"""
         
+        # Only deterministic generations are cacheable
+        use_cache = self.answer_cache is not None and temperature == 0.0
+        if use_cache:
+            cached_answer = await self.answer_cache.get(query, context_documents)
+            if cached_answer is not None:
+                return cached_answer
+        
         # Build prompt with context
         prompt = build_rag_prompt(query, context_documents)
         
@@ -60,6 +70,9 @@ class LLMGenerator:
             total_tokens=response.usage_metadata.total_token_count,
         )
         
+        if use_cache:
+            await self.answer_cache.set(query, context_documents, answer)
+        
         return answer
     
     async def generate_stream(
@@ -1,6 +1,21 @@
 from typing import List
 from src.retrieval.hybrid import SearchResult
 
+# Static instruction block that opens every RAG prompt. Keep it a plain
+# literal and keep all per-request content after it: provider-side prompt
+# caching only reuses byte-identical prefixes.
+_STATIC_PREAMBLE = """You are a helpful AI assistant that answers questions based on provided context documents.
+
+INSTRUCTIONS:
+1. Answer the question using ONLY information from the provided context documents
+2. If the answer is not in the context, say "I cannot answer this based on the provided documents"
+3. Cite your sources using the document numbers (e.g., [Document 1])
+4. Be concise but comprehensive
+5. If multiple documents provide relevant information, synthesize them
+
+CONTEXT DOCUMENTS:
+"""
+
 def build_rag_prompt(query: str, documents: List[SearchResult]) -> str:
     """
     Build RAG prompt with best practices:
@@ -10,35 +25,16 @@ def build_rag_prompt(query: str, documents: List[SearchResult]) -> str:
     - Grounding instructions
     """
     
-    # Format context documents
-    context_parts = []
+    # Collect fragments and join once so the context is copied a single time
+    # Order is static preamble, then context, then the query
+    parts = [_STATIC_PREAMBLE]
     for i, doc in enumerate(documents, start=1):
-        source_info = doc.metadata.get('source', 'Unknown')
-        page_info = doc.metadata.get('page', 'N/A')
-        
-        context_parts.append(
-            f"[Document {i}] (Source: {source_info}, Page: {page_info})\n"
-            f"{doc.content}\n"
+        metadata = doc.metadata
+        parts.append(
+            f"[Document {i}] (Source: {metadata.get('source', 'Unknown')}, "
+            f"Page: {metadata.get('page', 'N/A')})\n"
+            f"{doc.content}\n\n"
         )
+    parts.append(f"\nQUESTION:\n{query}\n\nANSWER:\n")
     
-    context_text = "\n".join(context_parts)
-    
-    prompt = f"""You are a helpful AI assistant that answers questions based on provided context documents.
-
-INSTRUCTIONS:
-1. Answer the question using ONLY information from the provided context documents
-2. If the answer is not in the context, say "I cannot answer this based on the provided documents"
-3. Cite your sources using the document numbers (e.g., [Document 1])
-4. Be concise but comprehensive
-5. If multiple documents provide relevant information, synthesize them
-
-CONTEXT DOCUMENTS:
-{context_text}
-
-QUESTION:
-{query}
-
-ANSWER:
-"""
-    
-    return prompt
+    return "".join(parts)
@@ -1,11 +1,110 @@
-from typing import List, Dict, Any
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from typing import List, Dict, Any, Optional
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import os
 import re
 
 from src.core.config import get_settings
+from src.utils.tokenize import tokenize
 
 settings = get_settings()
 
+# Markdown-style headers
+_HEADER_RE = re.compile(r'^(#{1,6})\s+(.+)$')
+
+# Below this many documents, process start-up and pickling cost more than
+# chunking in-process
+PARALLEL_CHUNKING_MIN_DOCUMENTS = 32
+
+def _split_on(text: str, separator: str) -> List[str]:
+    """Split on a literal separator, keeping it at the start of each piece"""
+    if not separator:
+        return list(text)
+    head, *rest = text.split(separator)
+    splits = [head] if head else []
+    splits.extend(separator + piece for piece in rest)
+    return splits
+
+def _merge_splits(splits: List[str], chunk_size: int, chunk_overlap: int) -> List[str]:
+    """
+    Greedily pack splits into chunks of at most chunk_size characters
+    
+    Consecutive chunks share a tail of up to chunk_overlap characters. The
+    window is tracked with a start index instead of re-slicing the list.
+    """
+    docs = []
+    window: List[str] = []
+    start = 0  # window[start:] is the current chunk
+    total = 0
+    for split in splits:
+        length = len(split)
+        if total + length > chunk_size and start < len(window):
+            doc = "".join(window[start:]).strip()
+            if doc:
+                docs.append(doc)
+            # Drop leading splits until only the overlap is left and the
+            # next split fits
+            while total > chunk_overlap or (total + length > chunk_size and total > 0):
+                total -= len(window[start])
+                start += 1
+        window.append(split)
+        total += length
+    doc = "".join(window[start:]).strip()
+    if doc:
+        docs.append(doc)
+    return docs
+
+def _recursive_split(
+    text: str,
+    separators: List[str],
+    chunk_size: int,
+    chunk_overlap: int,
+) -> List[str]:
+    """
+    Recursive character splitting
+    
+    Same output as LangChain's RecursiveCharacterTextSplitter with its
+    defaults (literal separators, kept at the start of the following piece,
+    whitespace stripped): split on the first separator present in the text,
+    pack pieces shorter than chunk_size, and recurse into longer pieces with
+    the remaining separators.
+    """
+    separator = separators[-1]
+    remaining: List[str] = []
+    for i, candidate in enumerate(separators):
+        if not candidate:
+            separator = candidate
+            break
+        if candidate in text:
+            separator = candidate
+            remaining = separators[i + 1:]
+            break
+    
+    chunks = []
+    good_splits: List[str] = []
+    for split in _split_on(text, separator):
+        if len(split) < chunk_size:
+            good_splits.append(split)
+            continue
+        if good_splits:
+            chunks.extend(_merge_splits(good_splits, chunk_size, chunk_overlap))
+            good_splits = []
+        if remaining:
+            chunks.extend(_recursive_split(split, remaining, chunk_size, chunk_overlap))
+        else:
+            chunks.append(split)
+    if good_splits:
+        chunks.extend(_merge_splits(good_splits, chunk_size, chunk_overlap))
+    return chunks
+
+def _chunk_one(
+    chunker: "DocumentChunker",
+    document: Dict[str, Any],
+    preserve_structure: bool,
+) -> List[Dict[str, Any]]:
+    """Module-level so it can be pickled into worker processes"""
+    return chunker.chunk_document(document, preserve_structure)
+
 class DocumentChunker:
     """Smart document chunking with overlap"""
     
@@ -32,12 +131,8 @@ class DocumentChunker:
             ""         # Character level (absolute last resort)
         ]
         
-        self.splitter = RecursiveCharacterTextSplitter(
-            separators=self.separators,
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            length_function=len,
-        )
+        # Created on the first large batch; see chunk_documents_parallel
+        self._pool: Optional[ProcessPoolExecutor] = None
     
     def chunk_document(
         self,
@@ -74,24 +169,21 @@ class DocumentChunker:
         metadata: Dict[str, Any],
     ) -> List[Dict[str, Any]]:
         """Chunk while preserving document structure"""
-        # Look for markdown-style headers
-        header_pattern = r'^(#{1,6})\s+(.+)$'
-        lines = content.split('\n')
-        
         chunks = []
-        current_chunk = ""
+        current_parts: List[str] = []
         current_header = None
         chunk_id = 0
         
-        for line in lines:
-            # Check if line is a header
-            header_match = re.match(header_pattern, line)
+        for line in content.split('\n'):
+            # Only lines starting with '#' can be headers
+            header_match = _HEADER_RE.match(line) if line.startswith('#') else None
             
             if header_match:
                 # Save previous chunk if it exists
-                if current_chunk.strip():
+                chunk_text = "\n".join(current_parts).strip()
+                if chunk_text:
                     chunk = self._create_chunk(
-                        content=current_chunk.strip(),
+                        content=chunk_text,
                         document_id=document_id,
                         chunk_id=f"{document_id}_{chunk_id}",
                         metadata={
@@ -105,14 +197,15 @@ class DocumentChunker:
                 
                 # Start new chunk with header
                 current_header = header_match.group(2)
-                current_chunk = line + "\n"
+                current_parts = [line]
             else:
-                current_chunk += line + "\n"
+                current_parts.append(line)
         
         # Don't forget the last chunk
-        if current_chunk.strip():
+        chunk_text = "\n".join(current_parts).strip()
+        if chunk_text:
             chunk = self._create_chunk(
-                content=current_chunk.strip(),
+                content=chunk_text,
                 document_id=document_id,
                 chunk_id=f"{document_id}_{chunk_id}",
                 metadata={
@@ -136,7 +229,7 @@ class DocumentChunker:
         metadata: Dict[str, Any],
     ) -> List[Dict[str, Any]]:
         """Simple recursive character chunking"""
-        texts = self.splitter.split_text(content)
+        texts = _recursive_split(content, self.separators, self.chunk_size, self.chunk_overlap)
         
         chunks = []
         for i, text in enumerate(texts):
@@ -162,6 +255,8 @@ class DocumentChunker:
         metadata: Dict[str, Any],
     ) -> Dict[str, Any]:
         """Create a chunk dictionary"""
+        # Tokenized once here; the BM25 index reuses these tokens
+        tokens = tokenize(content)
         return {
             "content": content,
             "document_id": document_id,
@@ -169,6 +264,8 @@ class DocumentChunker:
             "metadata": metadata,
             "char_count": len(content),
             "word_count": len(content.split()),
+            "tokens": tokens,
+            "token_count": len(tokens),
         }
     
     def chunk_documents(
@@ -178,9 +275,42 @@ class DocumentChunker:
     ) -> List[Dict[str, Any]]:
         """Chunk multiple documents"""
         all_chunks = []
-        
         for doc in documents:
-            chunks = self.chunk_document(doc, preserve_structure)
-            all_chunks.extend(chunks)
-        
+            all_chunks.extend(self.chunk_document(doc, preserve_structure))
         return all_chunks
+    
+    async def chunk_documents_parallel(
+        self,
+        documents: List[Dict[str, Any]],
+        preserve_structure: bool = True,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Chunk a batch of documents off the event loop, one chunk list per document
+        
+        Batches of at least PARALLEL_CHUNKING_MIN_DOCUMENTS are spread over a
+        process pool (shut down by close()); smaller ones run in a thread.
+        """
+        if len(documents) < PARALLEL_CHUNKING_MIN_DOCUMENTS:
+            return await asyncio.to_thread(
+                lambda: [self.chunk_document(doc, preserve_structure) for doc in documents]
+            )
+        
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+        loop = asyncio.get_running_loop()
+        return list(await asyncio.gather(*(
+            loop.run_in_executor(self._pool, _chunk_one, self, doc, preserve_structure)
+            for doc in documents
+        )))
+    
+    def close(self):
+        """Shut down the chunking process pool, if one was started"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        # Executors are not picklable; workers never need the pool
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        return state
@@ -1,12 +1,12 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, BinaryIO
 import asyncio
+import io
 import uuid
 from datetime import datetime
 import structlog
 
-from src.ingestion.parsers import DocumentParser
+from src.ingestion.parsers import DocumentParser, DEFAULT_STRATEGY
 from src.ingestion.chunker import DocumentChunker
-from src.ingestion.embedder import DocumentEmbedder
 from src.retrieval.vector_store import VectorStore
 from src.retrieval.bm25_store import BM25Store
 from src.core.config import get_settings
@@ -14,6 +14,11 @@ from src.core.config import get_settings
 logger = structlog.get_logger()
 settings = get_settings()
 
+# Chunks embedded and written per round during ingestion
+INDEX_BATCH_SIZE = 256
+# Embedded batches allowed to wait for the vector store
+EMBED_QUEUE_DEPTH = 4
+
 class DocumentIndexer:
     """Complete document ingestion pipeline"""
     
@@ -26,7 +31,10 @@ class DocumentIndexer:
         self.bm25_store = bm25_store
         self.parser = DocumentParser()
         self.chunker = DocumentChunker()
-        self.embedder = DocumentEmbedder()
+    
+    def close(self):
+        """Release worker processes started for batch ingestion"""
+        self.chunker.close()
     
     async def ingest_file(
         self,
@@ -51,44 +59,26 @@ class DocumentIndexer:
         if not metadata:
             metadata = {}
         
+        # One timestamp for every chunk and log line of this ingest
+        ingested_at = datetime.utcnow().isoformat()
+        
         try:
             # Parse document
             logger.info("parsing_document", file_path=file_path)
-            parsed_chunks = self.parser.parse_file(file_path)
-            
-            if not parsed_chunks:
-                raise ValueError("No content extracted from document")
-            
-            # Add document ID and metadata to all chunks
-            for chunk in parsed_chunks:
-                chunk["document_id"] = document_id
-                chunk["metadata"].update(metadata)
-                chunk["metadata"]["ingested_at"] = datetime.utcnow().isoformat()
+            parsed_chunks = await asyncio.to_thread(
+                self.parser.parse_file, file_path, self._parse_strategy(metadata)
+            )
             
-            # Chunk documents (if not already chunked by parser)
-            if len(parsed_chunks) == 1:
-                logger.info("chunking_document", chunks_before=len(parsed_chunks))
-                parsed_chunks = self.chunker.chunk_documents(parsed_chunks)
-                logger.info("chunking_complete", chunks_after=len(parsed_chunks))
-            
-            # Generate embeddings
-            logger.info("generating_embeddings", num_chunks=len(parsed_chunks))
-            documents_with_embeddings = await self.embedder.embed_documents(parsed_chunks)
-            
-            # Add to vector store
-            logger.info("adding_to_vector_store", num_documents=len(documents_with_embeddings))
-            await self.vector_store.add_documents(documents_with_embeddings)
-            
-            # Update BM25 index
-            logger.info("updating_bm25_index")
-            await self._update_bm25_index(documents_with_embeddings)
+            chunks_processed = await self._index_parsed(
+                parsed_chunks, document_id, metadata, ingested_at
+            )
             
             stats = {
                 "document_id": document_id,
                 "file_path": file_path,
-                "chunks_processed": len(documents_with_embeddings),
+                "chunks_processed": chunks_processed,
                 "status": "success",
-                "ingested_at": datetime.utcnow().isoformat(),
+                "ingested_at": ingested_at,
             }
             
             logger.info("ingestion_complete", **stats)
@@ -100,7 +90,7 @@ class DocumentIndexer:
                 "file_path": file_path,
                 "status": "error",
                 "error": str(e),
-                "ingested_at": datetime.utcnow().isoformat(),
+                "ingested_at": ingested_at,
             }
             logger.error("ingestion_failed", **error_stats)
             raise
@@ -111,6 +101,7 @@ class DocumentIndexer:
         filename: str,
         document_id: Optional[str] = None,
         metadata: Optional[Dict[str, Any]] = None,
+        mime_type: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Ingest file bytes
@@ -120,6 +111,40 @@ class DocumentIndexer:
             filename: Original filename
             document_id: Optional document ID
             metadata: Optional metadata
+            mime_type: Optional MIME type, skips format detection
+        
+        Returns:
+            Ingestion statistics
+        """
+        return await self.ingest_stream(
+            file_obj=io.BytesIO(file_bytes),
+            filename=filename,
+            document_id=document_id,
+            metadata=metadata,
+            mime_type=mime_type,
+        )
+    
+    async def ingest_stream(
+        self,
+        file_obj: BinaryIO,
+        filename: str,
+        document_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        mime_type: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Ingest a seekable binary file object (e.g. an upload's spooled file)
+        
+        The file is handed to the parser as-is, so large uploads are never
+        copied into a single in-memory bytes object. Parsing and chunking
+        run in worker threads to keep the event loop free.
+        
+        Args:
+            file_obj: Open binary file object
+            filename: Original filename
+            document_id: Optional document ID
+            metadata: Optional metadata
+            mime_type: Optional MIME type, skips format detection
         
         Returns:
             Ingestion statistics
@@ -130,44 +155,30 @@ class DocumentIndexer:
         if not metadata:
             metadata = {}
         
+        # One timestamp for every chunk and log line of this ingest
+        ingested_at = datetime.utcnow().isoformat()
+        
         try:
             # Parse document from bytes
             logger.info("parsing_document_bytes", filename=filename)
-            parsed_chunks = self.parser.parse_bytes(file_bytes, filename)
-            
-            if not parsed_chunks:
-                raise ValueError("No content extracted from document")
-            
-            # Add document ID and metadata to all chunks
-            for chunk in parsed_chunks:
-                chunk["document_id"] = document_id
-                chunk["metadata"].update(metadata)
-                chunk["metadata"]["ingested_at"] = datetime.utcnow().isoformat()
-            
-            # Chunk documents (if not already chunked by parser)
-            if len(parsed_chunks) == 1:
-                logger.info("chunking_document", chunks_before=len(parsed_chunks))
-                parsed_chunks = self.chunker.chunk_documents(parsed_chunks)
-                logger.info("chunking_complete", chunks_after=len(parsed_chunks))
+            parsed_chunks = await asyncio.to_thread(
+                self.parser.parse_stream,
+                file_obj,
+                filename,
+                mime_type,
+                self._parse_strategy(metadata),
+            )
             
-            # Generate embeddings
-            logger.info("generating_embeddings", num_chunks=len(parsed_chunks))
-            documents_with_embeddings = await self.embedder.embed_documents(parsed_chunks)
-            
-            # Add to vector store
-            logger.info("adding_to_vector_store", num_documents=len(documents_with_embeddings))
-            await self.vector_store.add_documents(documents_with_embeddings)
-            
-            # Update BM25 index
-            logger.info("updating_bm25_index")
-            await self._update_bm25_index(documents_with_embeddings)
+            chunks_processed = await self._index_parsed(
+                parsed_chunks, document_id, metadata, ingested_at
+            )
             
             stats = {
                 "document_id": document_id,
                 "filename": filename,
-                "chunks_processed": len(documents_with_embeddings),
+                "chunks_processed": chunks_processed,
                 "status": "success",
-                "ingested_at": datetime.utcnow().isoformat(),
+                "ingested_at": ingested_at,
             }
             
             logger.info("ingestion_complete", **stats)
@@ -179,11 +190,190 @@ class DocumentIndexer:
                 "filename": filename,
                 "status": "error",
                 "error": str(e),
-                "ingested_at": datetime.utcnow().isoformat(),
+                "ingested_at": ingested_at,
             }
             logger.error("ingestion_failed", **error_stats)
             raise
     
+    async def ingest_bytes_batch(
+        self,
+        items: List[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Ingest several documents through one embedding and indexing pass
+        
+        Every document is parsed first (up to INGEST_CONCURRENCY in worker
+        threads) and the ones that need it are chunked together, across
+        processes for large batches; the combined chunks are then embedded,
+        written to the vector store and added to BM25 once, instead of once
+        per document.
+        
+        Args:
+            items: Dicts with the ingest_bytes arguments (file_bytes,
+                filename and optional document_id, metadata, mime_type)
+        
+        Returns:
+            Ingestion statistics per item, in order; documents that fail to
+            parse get an "error" entry and are left out of the index
+        """
+        ingested_at = datetime.utcnow().isoformat()
+        semaphore = asyncio.Semaphore(settings.INGEST_CONCURRENCY)
+        
+        async def prepare(item: Dict[str, Any]) -> List[Dict[str, Any]]:
+            metadata = item.get("metadata") or {}
+            logger.info("parsing_document_bytes", filename=item["filename"])
+            async with semaphore:
+                parsed_chunks = await asyncio.to_thread(
+                    self.parser.parse_stream,
+                    io.BytesIO(item["file_bytes"]),
+                    item["filename"],
+                    item.get("mime_type"),
+                    self._parse_strategy(metadata),
+                )
+            return self._tag_parsed(
+                parsed_chunks, item["document_id"], metadata, ingested_at
+            )
+        
+        items = [
+            {**item, "document_id": item.get("document_id") or str(uuid.uuid4())}
+            for item in items
+        ]
+        prepared = await asyncio.gather(
+            *(prepare(item) for item in items), return_exceptions=True
+        )
+        
+        # Chunk every document the parser left whole in one batch
+        unchunked = [
+            i for i, parsed in enumerate(prepared)
+            if not isinstance(parsed, BaseException) and len(parsed) == 1
+        ]
+        if unchunked:
+            logger.info("chunking_documents", num_documents=len(unchunked))
+            chunked = await self.chunker.chunk_documents_parallel(
+                [prepared[i][0] for i in unchunked]
+            )
+            for i, chunks in zip(unchunked, chunked):
+                prepared[i] = chunks
+        
+        all_chunks = [
+            chunk
+            for chunks in prepared
+            if not isinstance(chunks, BaseException)
+            for chunk in chunks
+        ]
+        if all_chunks:
+            await self._index_chunks(all_chunks)
+        
+        results = []
+        for item, chunks in zip(items, prepared):
+            stats = {
+                "document_id": item["document_id"],
+                "filename": item["filename"],
+                "ingested_at": ingested_at,
+            }
+            if isinstance(chunks, BaseException):
+                stats.update(status="error", error=str(chunks))
+                logger.error("ingestion_failed", **stats)
+            else:
+                stats.update(chunks_processed=len(chunks), status="success")
+                logger.info("ingestion_complete", **stats)
+            results.append(stats)
+        return results
+    
+    @staticmethod
+    def _parse_strategy(metadata: Dict[str, Any]) -> str:
+        """Layout/OCR parsing only for documents flagged as needing it"""
+        return "hi_res" if metadata.get("needs_ocr") else DEFAULT_STRATEGY
+    
+    async def _index_parsed(
+        self,
+        parsed_chunks: List[Dict[str, Any]],
+        document_id: str,
+        metadata: Dict[str, Any],
+        ingested_at: str,
+    ) -> int:
+        """Tag, chunk and index parsed elements; returns the number of chunks"""
+        chunks = await self._prepare_chunks(parsed_chunks, document_id, metadata, ingested_at)
+        await self._index_chunks(chunks)
+        return len(chunks)
+    
+    async def _prepare_chunks(
+        self,
+        parsed_chunks: List[Dict[str, Any]],
+        document_id: str,
+        metadata: Dict[str, Any],
+        ingested_at: str,
+    ) -> List[Dict[str, Any]]:
+        """Tag parsed elements with document metadata and chunk them"""
+        parsed_chunks = self._tag_parsed(parsed_chunks, document_id, metadata, ingested_at)
+        
+        # Chunk documents (if not already chunked by parser)
+        if len(parsed_chunks) == 1:
+            logger.info("chunking_document", chunks_before=len(parsed_chunks))
+            parsed_chunks = await asyncio.to_thread(
+                self.chunker.chunk_documents, parsed_chunks
+            )
+            logger.info("chunking_complete", chunks_after=len(parsed_chunks))
+        
+        return parsed_chunks
+    
+    @staticmethod
+    def _tag_parsed(
+        parsed_chunks: List[Dict[str, Any]],
+        document_id: str,
+        metadata: Dict[str, Any],
+        ingested_at: str,
+    ) -> List[Dict[str, Any]]:
+        """Add the document ID and metadata to every parsed element"""
+        if not parsed_chunks:
+            raise ValueError("No content extracted from document")
+        
+        # Add document ID and metadata to all chunks
+        for chunk in parsed_chunks:
+            chunk["document_id"] = document_id
+            chunk["metadata"].update(metadata)
+            chunk["metadata"]["ingested_at"] = ingested_at
+        
+        return parsed_chunks
+    
+    async def _index_chunks(self, chunks: List[Dict[str, Any]]):
+        """
+        Embed and store chunks in fixed-size batches
+        
+        Embedding and vector store writes run as a two-stage pipeline: the
+        next batch is encoded by the vector store's model while the previous
+        (batch, matrix) pair is being written. The queue is bounded, so at
+        most EMBED_QUEUE_DEPTH batches of vectors are held in memory at once.
+        """
+        logger.info("generating_embeddings", num_chunks=len(chunks))
+        queue: asyncio.Queue = asyncio.Queue(maxsize=EMBED_QUEUE_DEPTH)
+        
+        async def produce():
+            try:
+                for start in range(0, len(chunks), INDEX_BATCH_SIZE):
+                    batch = chunks[start:start + INDEX_BATCH_SIZE]
+                    await queue.put((batch, await self.vector_store.encode_documents(batch)))
+                await queue.put(None)
+            except Exception as e:
+                # Hand the failure to the consumer so it stops waiting
+                await queue.put(e)
+        
+        producer = asyncio.create_task(produce())
+        try:
+            while (item := await queue.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                batch, embeddings = item
+                logger.info("adding_to_vector_store", num_documents=len(batch))
+                await self.vector_store.add_documents(batch, embeddings)
+        finally:
+            # No-op once the producer is done; stops it if a write failed
+            producer.cancel()
+        
+        # BM25 only needs content and metadata; one add persists once
+        logger.info("updating_bm25_index")
+        await self._update_bm25_index(chunks)
+    
     async def delete_document(self, document_id: str) -> Dict[str, Any]:
         """Delete a document from all stores"""
         try:
@@ -205,14 +395,7 @@ class DocumentIndexer:
             raise
     
     async def _update_bm25_index(self, new_documents: List[Dict[str, Any]]):
-        """Update BM25 index with new documents"""
-        # In a production system, you'd want to:
-        # 1. Load existing documents from BM25 store
-        # 2. Add new documents
-        # 3. Rebuild index
-        
-        # For now, we'll just add the new documents
-        # This is a simplification - in production, implement proper incremental updates
+        """Add new documents to the incremental BM25 index"""
         await self.bm25_store.add_documents(new_documents)
     
     def get_supported_formats(self) -> List[str]:
@@ -1,40 +1,90 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, BinaryIO, Optional
 import io
 from pathlib import Path
 import magic
 from unstructured.partition.auto import partition
 from unstructured.documents.elements import Element
 
+# libmagic only needs the file header to detect the MIME type
+MAGIC_HEADER_BYTES = 2048
+
+# MIME types for the supported extensions; libmagic is only consulted for
+# anything not listed here
+_EXT_MIME = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".doc": "application/msword",
+    ".txt": "text/plain",
+    ".rtf": "text/rtf",
+    ".odt": "application/vnd.oasis.opendocument.text",
+    ".pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    ".ppt": "application/vnd.ms-powerpoint",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".xls": "application/vnd.ms-excel",
+    ".csv": "text/csv",
+    ".html": "text/html",
+    ".htm": "text/html",
+    ".md": "text/markdown",
+    ".json": "application/json",
+    ".xml": "application/xml",
+}
+
+# Content-Type values that say nothing about the actual format
+_GENERIC_MIME = frozenset({"", "application/octet-stream", "binary/octet-stream"})
+
+# unstructured's "fast" strategy extracts embedded text without running the
+# layout model; scanned documents need "hi_res" to get OCR
+DEFAULT_STRATEGY = "fast"
+
+def _elements_to_chunks(
+    elements: List[Element],
+    source: str,
+    stem: str,
+    mime_type: str,
+) -> List[Dict[str, Any]]:
+    """Turn partitioned elements into chunk dicts, skipping empty text"""
+    base_metadata = {"source": source, "file_type": mime_type}
+    chunks = []
+    for i, element in enumerate(elements):
+        text = element.text.strip()
+        if not text:
+            continue
+        chunks.append({
+            "content": text,
+            "metadata": {
+                **base_metadata,
+                "element_type": getattr(element, 'category', 'unknown'),
+                "page_number": getattr(element, 'page_number', None),
+                "element_id": i,
+            },
+            "document_id": stem,
+            "chunk_id": f"{stem}_{i}",
+        })
+    return chunks
+
 class DocumentParser:
     """Parse various document formats using unstructured.io"""
     
     @staticmethod
-    def parse_file(file_path: str) -> List[Dict[str, Any]]:
+    def parse_file(file_path: str, strategy: str = DEFAULT_STRATEGY) -> List[Dict[str, Any]]:
         """Parse a file and return list of text chunks with metadata"""
         try:
-            # Get file type
-            mime_type = magic.from_file(file_path, mime=True)
+            # Get file type, from the extension when it is a known one
+            mime_type = (
+                _EXT_MIME.get(Path(file_path).suffix.lower())
+                or magic.from_file(file_path, mime=True)
+            )
             
             # Parse document
-            elements = partition(filename=file_path)
+            elements = partition(
+                filename=file_path,
+                content_type=mime_type,
+                strategy=strategy,
+            )
             
             # Convert elements to chunks
-            chunks = []
-            for i, element in enumerate(elements):
-                if hasattr(element, 'text') and element.text.strip():
-                    chunk = {
-                        "content": element.text.strip(),
-                        "metadata": {
-                            "source": Path(file_path).name,
-                            "file_type": mime_type,
-                            "element_type": element.category if hasattr(element, 'category') else 'unknown',
-                            "page_number": getattr(element, 'page_number', None),
-                            "element_id": i,
-                        },
-                        "document_id": Path(file_path).stem,
-                        "chunk_id": f"{Path(file_path).stem}_{i}",
-                    }
-                    chunks.append(chunk)
+            path = Path(file_path)
+            chunks = _elements_to_chunks(elements, path.name, path.stem, mime_type)
             
             return chunks
             
@@ -42,32 +92,55 @@ class DocumentParser:
             raise ValueError(f"Failed to parse {file_path}: {str(e)}")
     
     @staticmethod
-    def parse_bytes(file_bytes: bytes, filename: str) -> List[Dict[str, Any]]:
+    def parse_bytes(
+        file_bytes: bytes,
+        filename: str,
+        mime_type: Optional[str] = None,
+        strategy: str = DEFAULT_STRATEGY,
+    ) -> List[Dict[str, Any]]:
         """Parse file bytes and return list of text chunks with metadata"""
+        return DocumentParser.parse_stream(io.BytesIO(file_bytes), filename, mime_type, strategy)
+    
+    @staticmethod
+    def parse_stream(
+        file_obj: BinaryIO,
+        filename: str,
+        mime_type: Optional[str] = None,
+        strategy: str = DEFAULT_STRATEGY,
+    ) -> List[Dict[str, Any]]:
+        """
+        Parse a seekable binary file object without reading it into memory
+        
+        Args:
+            file_obj: Open binary file (e.g. an upload's SpooledTemporaryFile)
+            filename: Original filename
+            mime_type: Optional client-supplied MIME type (e.g. the upload's
+                Content-Type); generic values are ignored
+            strategy: unstructured partition strategy ("fast" or "hi_res")
+        
+        Returns:
+            List of text chunks with metadata
+        """
         try:
-            # Get file type from bytes
-            mime_type = magic.from_buffer(file_bytes, mime=True)
+            # Get file type: caller's MIME type, then extension, then the
+            # first bytes via libmagic
+            if not mime_type or mime_type in _GENERIC_MIME:
+                mime_type = _EXT_MIME.get(Path(filename).suffix.lower())
+            if not mime_type:
+                file_obj.seek(0)
+                mime_type = magic.from_buffer(file_obj.read(MAGIC_HEADER_BYTES), mime=True)
+            file_obj.seek(0)
             
-            # Parse document from bytes
-            elements = partition(file=io.BytesIO(file_bytes))
+            # Parse document straight from the file object
+            elements = partition(
+                file=file_obj,
+                metadata_filename=filename,
+                content_type=mime_type,
+                strategy=strategy,
+            )
             
             # Convert elements to chunks
-            chunks = []
-            for i, element in enumerate(elements):
-                if hasattr(element, 'text') and element.text.strip():
-                    chunk = {
-                        "content": element.text.strip(),
-                        "metadata": {
-                            "source": filename,
-                            "file_type": mime_type,
-                            "element_type": element.category if hasattr(element, 'category') else 'unknown',
-                            "page_number": getattr(element, 'page_number', None),
-                            "element_id": i,
-                        },
-                        "document_id": Path(filename).stem,
-                        "chunk_id": f"{Path(filename).stem}_{i}",
-                    }
-                    chunks.append(chunk)
+            chunks = _elements_to_chunks(elements, filename, Path(filename).stem, mime_type)
             
             return chunks
             
@@ -1,51 +1,134 @@
-from typing import List, Dict, Any
-from rank_bm25 import BM25Okapi
-import nltk
-from nltk.tokenize import word_tokenize
+from typing import List, Dict, Any, Iterable, Optional, Sequence, Tuple
+from array import array
+from collections import Counter
+from pathlib import Path
+import asyncio
+import json
+import os
 import pickle
+import shutil
+import tempfile
+import time
+import msgpack
+import numpy as np
 import redis.asyncio as redis
 
 from src.retrieval.hybrid import SearchResult
 from src.core.config import get_settings
+from src.utils.tokenize import tokenize, TOKENIZER_VERSION
 
 settings = get_settings()
 
-# Download NLTK data if needed
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
+# Persisted layout: one msgpack record per document under bm25:doc:{i}
+# ({content, metadata, document_id, chunk_id, tf}), written and read in
+# MSET/MGET batches; bm25:doc_count allocates indices with INCRBY
+DOC_KEY_PREFIX = "bm25:doc:"
+DOC_COUNT_KEY = "bm25:doc_count"
+TOKENIZER_KEY = "bm25:tokenizer"
+# Bumped whenever the records are cleared, so index counts are not reused
+GENERATION_KEY = "bm25:generation"
+PERSIST_BATCH_SIZE = 1000
+# How long a reserved but unwritten index can hold back the sync watermark
+# before it is given up on (its writer most likely failed after INCRBY)
+GAP_TIMEOUT_SECONDS = 30.0
+# Single-pickle layout used before per-document keys
+LEGACY_KEYS = ("bm25_index", "bm25_documents")
+
+# Local snapshot of a fully loaded index: .npy arrays opened with mmap plus
+# msgpack vocab/documents, in a directory named after the Redis state
+# (generation, doc count, tokenizer) it was built from
+_CACHE_ARRAYS = (
+    "doc_indptr", "term_ids", "term_freqs", "doc_len", "_indptr", "_indices", "_scores",
+)
+_APPENDABLE = {"doc_indptr": "q", "term_ids": "i", "term_freqs": "i", "doc_len": "i"}
+
+def _score_matrix(
+    doc_indptr: np.ndarray,
+    term_ids: np.ndarray,
+    tf: np.ndarray,
+    doc_len: np.ndarray,
+    total_len: int,
+    vocab_size: int,
+    k1: float,
+    b: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Term x document BM25 score matrix as CSR (indptr, doc indices, scores)
+    
+    Uses the non-negative IDF log(1 + (N - df + 0.5) / (df + 0.5)), which
+    stays positive for terms found in most documents instead of needing an
+    epsilon floor. Every score depends on N and avgdl, so all rows are
+    recomputed, but purely with array operations over the doc-major data.
+    """
+    n = len(doc_len)
+    avgdl = total_len / max(n, 1)
+    
+    doc_ids = np.repeat(np.arange(n, dtype=np.int32), np.diff(doc_indptr))
+    doc_freq = np.bincount(term_ids, minlength=vocab_size)
+    idf = np.log(1 + (n - doc_freq + 0.5) / (doc_freq + 0.5))
+    norm = k1 * (1 - b + b * doc_len[doc_ids] / avgdl)
+    scores = idf[term_ids] * tf * (k1 + 1) / (tf + norm)
+    
+    # Transpose to term-major; stable, so each row lists docs in order
+    order = np.argsort(term_ids, kind="stable")
+    indptr = np.concatenate(([0], np.cumsum(doc_freq)))
+    return indptr, doc_ids[order], scores[order].astype(np.float32)
 
 class BM25Store:
-    """BM25 search store with Redis persistence"""
+    """
+    Incremental BM25 search store with Redis persistence
+    
+    Terms get integer ids, and each document's (term id, frequency) pairs are
+    appended to flat doc-major arrays, so adding documents only tokenizes and
+    persists the new ones. Each search first posts any records other workers
+    appended to Redis since the last one. On the first search after an add,
+    the full BM25 score of every (term, document) pair is computed in a worker
+    thread into a CSR matrix (one row per term) and swapped in, so a query is
+    just a sum of a few row slices.
+    """
     
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: redis.Redis, k1: float = 1.5, b: float = 0.75):
         self.redis = redis_client
-        self.bm25_index = None
-        self.documents = []
+        self.k1 = k1
+        self.b = b
+        self.vocab: Dict[str, int] = {}  # Term -> term id
+        # Doc-major CSR of term frequencies: document i owns
+        # term_ids/term_freqs[doc_indptr[i]:doc_indptr[i + 1]]
+        self.doc_indptr = array("q", [0])
+        self.term_ids = array("i")
+        self.term_freqs = array("i")
+        self.doc_len = array("i")
+        self.total_len = 0
         self.doc_mapping = {}  # Maps index to document info
+        # Eager term-major score matrix, rebuilt lazily after adds. It covers
+        # the first _matrix_docs documents of index epoch _matrix_epoch;
+        # _epoch is bumped whenever the index is reset.
+        self._epoch = 0
+        self._matrix_epoch = -1
+        self._matrix_docs = 0
+        self._rebuild: Optional[asyncio.Task] = None
+        self._clear_scores()
+        # Redis state the local index reflects: every record index below
+        # _synced is posted, and _seen holds the posted indices above it
+        # (past a range another writer has reserved but not yet written).
+        # _gaps maps each unwritten index to when it was first found missing.
+        # _generation is None until the first load.
+        self._generation: Optional[int] = None
+        self._synced = 0
+        self._seen: set = set()
+        self._gaps: Dict[int, float] = {}
+        self._load_lock = asyncio.Lock()
     
     async def build_index(self, documents: List[Dict[str, Any]]):
-        """Build BM25 index from documents"""
-        self.documents = documents
-        
-        # Tokenize documents
-        tokenized_docs = []
-        for i, doc in enumerate(documents):
-            tokens = word_tokenize(doc["content"].lower())
-            tokenized_docs.append(tokens)
-            self.doc_mapping[i] = {
-                "content": doc["content"],
-                "metadata": doc.get("metadata", {}),
-                "document_id": doc.get("document_id", ""),
-                "chunk_id": doc.get("chunk_id", ""),
-            }
-        
-        # Build BM25 index
-        self.bm25_index = BM25Okapi(tokenized_docs)
-        
-        # Save to Redis
-        await self._save_to_redis()
+        """Build BM25 index from documents, replacing any existing index"""
+        async with self._load_lock:
+            self._reset()
+            records = self._records(documents)
+            
+            # Save to Redis
+            self._generation = await self._clear_redis()
+            start = await self._save_to_redis(records)
+            self._post_records(enumerate(records, start))
     
     async def search(
         self,
@@ -53,85 +136,384 @@ class BM25Store:
         top_k: int = 20,
     ) -> List[SearchResult]:
         """Search using BM25"""
-        if not self.bm25_index:
-            # Try to load from Redis
-            await self._load_from_redis()
-            if not self.bm25_index:
-                return []
+        await self._sync()
+        if not len(self.doc_len):
+            return []
         
         # Tokenize query
-        query_tokens = word_tokenize(query.lower())
+        query_tokens = tokenize(query)
         
-        # Get BM25 scores
-        scores = self.bm25_index.get_scores(query_tokens)
+        # Sum the precomputed score rows of the query terms; terms and
+        # documents newer than the matrix are not in it
+        await self._refresh_scores()
+        indptr = self._indptr
+        rows = [self.vocab[term] for term in query_tokens if term in self.vocab]
+        rows = [r for r in rows if r < len(indptr) - 1]
+        if not rows:
+            return []
+        doc_ids = np.concatenate([self._indices[indptr[r]:indptr[r + 1]] for r in rows])
+        weights = np.concatenate([self._scores[indptr[r]:indptr[r + 1]] for r in rows])
+        scores = np.bincount(doc_ids, weights=weights, minlength=len(self.doc_len))
         
-        # Get top-k results
-        top_indices = sorted(
-            range(len(scores)),
-            key=lambda i: scores[i],
-            reverse=True
-        )[:top_k]
+        # Get top-k results among matching documents (all scores are positive)
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        top = matched[np.argsort(-scores[matched], kind="stable")]
         
         results = []
-        for idx in top_indices:
-            if scores[idx] > 0:  # Only include relevant results
-                doc_info = self.doc_mapping[idx]
-                result = SearchResult(
-                    content=doc_info["content"],
-                    metadata=doc_info["metadata"],
-                    score=float(scores[idx]),
-                    source="bm25",
-                )
-                results.append(result)
+        for idx in top.tolist():
+            doc_info = self.doc_mapping[idx]
+            result = SearchResult(
+                content=doc_info["content"],
+                metadata=doc_info["metadata"],
+                score=float(scores[idx]),
+                source="bm25",
+                doc_uid=doc_info["doc_uid"],
+            )
+            results.append(result)
         
         return results
     
     async def add_documents(self, documents: List[Dict[str, Any]]):
-        """Add documents and rebuild index"""
-        # For simplicity, rebuild entire index
-        # In production, implement incremental updates
-        await self.build_index(documents)
-    
-    async def _save_to_redis(self):
-        """Save BM25 index to Redis"""
-        if not self.bm25_index:
-            return
+        """Add documents to the existing index"""
+        # Locked from sync to post, so a concurrent sync cannot read the
+        # new records back from Redis and post them a second time
+        async with self._load_lock:
+            await self._sync_locked()
+            records = self._records(documents)
+            start = await self._save_to_redis(records)
+            self._post_records(enumerate(records, start))
+    
+    def _reset(self):
+        self.vocab = {}
+        self.doc_indptr = array("q", [0])
+        self.term_ids = array("i")
+        self.term_freqs = array("i")
+        self.doc_len = array("i")
+        self.total_len = 0
+        self.doc_mapping = {}
+        self._synced = 0
+        self._seen = set()
+        self._gaps = {}
+        self._epoch += 1
+        self._clear_scores()
+    
+    def _clear_scores(self):
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self._scores = np.zeros(0, dtype=np.float32)
+    
+    @staticmethod
+    def _records(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Records to persist for new documents, tokenizing any without tokens"""
+        records = []
+        for doc in documents:
+            # Chunks from DocumentChunker arrive pre-tokenized
+            tokens = doc.get("tokens")
+            if tokens is None:
+                tokens = tokenize(doc["content"])
+            record = {
+                "content": doc["content"],
+                "metadata": doc.get("metadata", {}),
+                "document_id": doc.get("document_id", ""),
+                "chunk_id": doc.get("chunk_id", ""),
+                "tf": dict(Counter(tokens)),
+            }
+            records.append(record)
+        return records
+    
+    def _post_records(self, indexed: Iterable[Tuple[int, Dict[str, Any]]]):
+        """Post records stored under the given Redis indices"""
+        # Arrays memory-mapped from the local cache are read-only
+        for name, typecode in _APPENDABLE.items():
+            values = getattr(self, name)
+            if not isinstance(values, array):
+                setattr(self, name, array(typecode, np.ascontiguousarray(values).tobytes()))
         
-        # Serialize BM25 index
-        bm25_data = {
-            "corpus": self.bm25_index.corpus,
-            "idf": self.bm25_index.idf,
-            "doc_len": self.bm25_index.doc_len,
-            "doc_freqs": self.bm25_index.doc_freqs,
-        }
+        seen = self._seen
+        for idx, record in indexed:
+            self._post(record)
+            seen.add(idx)
+            self._gaps.pop(idx, None)
+        self._advance()
+    
+    def _skip_gaps(self, missing: Iterable[int]):
+        """
+        Give up on indices that have stayed unwritten past GAP_TIMEOUT_SECONDS
         
-        # Save to Redis
-        await self.redis.set(
-            "bm25_index",
-            pickle.dumps(bm25_data)
-        )
-        await self.redis.set(
-            "bm25_documents",
-            pickle.dumps(self.doc_mapping)
+        They are marked seen without a record, so the watermark can move past
+        a writer that died or failed between reserving and writing its range.
+        A record that still lands afterwards is only picked up on a reload.
+        """
+        now = time.monotonic()
+        gaps = self._gaps
+        for idx in missing:
+            if now - gaps.setdefault(idx, now) >= GAP_TIMEOUT_SECONDS:
+                del gaps[idx]
+                self._seen.add(idx)
+        self._advance()
+    
+    def _advance(self):
+        """Move the watermark past every contiguous seen index"""
+        seen = self._seen
+        while self._synced in seen:
+            seen.discard(self._synced)
+            self._synced += 1
+    
+    def _post(self, record: Dict[str, Any]):
+        """Append one document's term frequencies to the doc-major arrays"""
+        # Local row; Redis indices are tracked by _post_records
+        idx = len(self.doc_len)
+        vocab = self.vocab
+        tf = record["tf"]
+        self.term_ids.extend(vocab.setdefault(term, len(vocab)) for term in tf)
+        self.term_freqs.extend(tf.values())
+        self.doc_indptr.append(len(self.term_ids))
+        length = sum(tf.values())
+        self.doc_len.append(length)
+        self.total_len += length
+        self.doc_mapping[idx] = {
+            "content": record["content"],
+            "metadata": record["metadata"],
+            "document_id": record["document_id"],
+            "chunk_id": record["chunk_id"],
+            "doc_uid": f"{record['document_id']}_{record['chunk_id']}",
+        }
+    
+    async def _refresh_scores(self):
+        """Wait until the score matrix covers every document posted so far"""
+        epoch, n = self._epoch, len(self.doc_len)
+        while self._matrix_epoch != self._epoch or (
+            self._epoch == epoch and self._matrix_docs < n
+        ):
+            # Concurrent searches share one rebuild; a rebuild started
+            # before the latest posts is waited out and followed by another
+            if self._rebuild is None:
+                self._rebuild = asyncio.ensure_future(self._rebuild_scores())
+            await asyncio.shield(self._rebuild)
+    
+    async def _rebuild_scores(self):
+        """Build the score matrix in a worker thread and swap it in"""
+        epoch, n = self._epoch, len(self.doc_len)
+        # Copied here, on the loop: posts keep appending to (and resizing)
+        # the doc-major buffers while the worker runs
+        inputs = (
+            np.array(self.doc_indptr, dtype=np.int64),
+            np.array(self.term_ids, dtype=np.int32),
+            np.array(self.term_freqs, dtype=np.float64),
+            np.array(self.doc_len, dtype=np.float64),
+            self.total_len,
+            len(self.vocab),
         )
+        try:
+            matrix = await asyncio.to_thread(_score_matrix, *inputs, self.k1, self.b)
+        finally:
+            self._rebuild = None
+        # Dropped if the index was reset or reloaded in the meantime
+        if self._epoch == epoch:
+            self._indptr, self._indices, self._scores = matrix
+            self._matrix_epoch, self._matrix_docs = epoch, n
+    
+    async def _sync(self):
+        """Bring the local index up to date with the records in Redis"""
+        if self._generation is not None:
+            # One round trip when no worker wrote or rebuilt since last time
+            try:
+                count, generation = await self.redis.mget(DOC_COUNT_KEY, GENERATION_KEY)
+            except Exception:
+                # Keep serving the local index while Redis is unreachable
+                return
+            if int(generation or 0) == self._generation and int(count or 0) == self._synced:
+                return
+        async with self._load_lock:
+            await self._sync_locked()
+    
+    async def _sync_locked(self):
+        """Post records other workers appended; reload after a rebuild"""
+        if self._generation is None:
+            await self._load_from_redis()
+            return
+        
+        try:
+            count, generation = await self.redis.mget(DOC_COUNT_KEY, GENERATION_KEY)
+            if int(generation or 0) != self._generation:
+                # Cleared and rebuilt elsewhere
+                await self._load_from_redis()
+                return
+            # Only the tail past the last sync, minus records already posted
+            pending = [
+                i for i in range(self._synced, int(count or 0)) if i not in self._seen
+            ]
+            if pending:
+                indexed = await self._read_redis(pending)
+                self._post_records(indexed.items())
+                self._skip_gaps(i for i in pending if i not in indexed)
+        except Exception:
+            # Retried on the next search
+            return
+    
+    async def _save_to_redis(self, records: List[Dict[str, Any]]) -> int:
+        """Append document records to Redis in MSET batches; returns the first index"""
+        if not records:
+            return 0
+        
+        # Reserve a contiguous index range, safe across API replicas
+        end = await self.redis.incrby(DOC_COUNT_KEY, len(records))
+        start = end - len(records)
+        # Every batch goes out in one pipelined round trip
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for offset in range(0, len(records), PERSIST_BATCH_SIZE):
+                batch = records[offset:offset + PERSIST_BATCH_SIZE]
+                pipe.mset({
+                    f"{DOC_KEY_PREFIX}{start + offset + i}": msgpack.packb(record, use_bin_type=True)
+                    for i, record in enumerate(batch)
+                })
+            pipe.set(TOKENIZER_KEY, TOKENIZER_VERSION)
+            await pipe.execute()
+        return start
+    
+    async def _clear_redis(self) -> int:
+        """Delete every persisted record, including the legacy layout; returns the new generation"""
+        count = int(await self.redis.get(DOC_COUNT_KEY) or 0)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for start in range(0, count, PERSIST_BATCH_SIZE):
+                pipe.delete(*(
+                    f"{DOC_KEY_PREFIX}{i}"
+                    for i in range(start, min(start + PERSIST_BATCH_SIZE, count))
+                ))
+            pipe.delete(DOC_COUNT_KEY, TOKENIZER_KEY, *LEGACY_KEYS)
+            pipe.incr(GENERATION_KEY)
+            return int((await pipe.execute())[-1])
+    
+    async def _read_redis(self, indices: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+        """Read the persisted records at the given indices in MGET batches"""
+        records = {}
+        for start in range(0, len(indices), PERSIST_BATCH_SIZE):
+            batch = indices[start:start + PERSIST_BATCH_SIZE]
+            values = await self.redis.mget([f"{DOC_KEY_PREFIX}{i}" for i in batch])
+            # Gaps are ranges reserved by a writer that has not finished
+            records.update(
+                (i, msgpack.unpackb(v, raw=False)) for i, v in zip(batch, values) if v is not None
+            )
+        return records
+    
+    async def _read_legacy(self) -> List[Dict[str, Any]]:
+        """Document infos from the single-pickle layout, without term frequencies"""
+        doc_data = await self.redis.get("bm25_documents")
+        if not doc_data:
+            return []
+        doc_mapping = pickle.loads(doc_data)
+        return [doc_mapping[idx] for idx in sorted(doc_mapping)]
     
     async def _load_from_redis(self):
-        """Load BM25 index from Redis"""
+        """Load BM25 index from the local mmap cache, or from Redis"""
+        self._reset()
         try:
-            # Load BM25 index
-            bm25_data = await self.redis.get("bm25_index")
-            if bm25_data:
-                bm25_dict = pickle.loads(bm25_data)
-                self.bm25_index = BM25Okapi(bm25_dict["corpus"])
-                self.bm25_index.idf = bm25_dict["idf"]
-                self.bm25_index.doc_len = bm25_dict["doc_len"]
-                self.bm25_index.doc_freqs = bm25_dict["doc_freqs"]
-            
-            # Load document mapping
-            doc_data = await self.redis.get("bm25_documents")
-            if doc_data:
-                self.doc_mapping = pickle.loads(doc_data)
-                
+            count, tokenizer, generation = await self.redis.mget(
+                DOC_COUNT_KEY, TOKENIZER_KEY, GENERATION_KEY
+            )
+            generation = int(generation or 0)
+            if count is None:
+                records = await self._read_legacy()
+                tokenizer = None
+            else:
+                count = int(count)
+                tokenizer = tokenizer.decode() if tokenizer else None
+                cache_dir = Path(settings.BM25_CACHE_DIR) / (
+                    f"{generation}-{count}-{tokenizer}"
+                )
+                if tokenizer == TOKENIZER_VERSION and self._load_cache(cache_dir):
+                    self._generation = generation
+                    self._synced = count
+                    return
+                indexed = await self._read_redis(range(count))
+                records = list(indexed.values())
         except Exception:
-            # If loading fails, start fresh
+            # If loading fails, start fresh; the next search retries
+            self._reset()
+            return
+        
+        if tokenizer == TOKENIZER_VERSION:
+            self._generation = generation
+            self._post_records(indexed.items())
+            self._skip_gaps(i for i in range(count) if i not in indexed)
+            # Snapshot only a complete view (no ranges still being written)
+            if records and len(records) == count:
+                await self._write_cache(cache_dir)
+            return
+        
+        # Written with another tokenizer or in the legacy layout: re-tokenize
+        # the stored contents so queries and index agree, and persist the
+        # result in the current layout
+        records = self._records(records)
+        start = 0
+        if records:
+            generation = await self._clear_redis()
+            start = await self._save_to_redis(records)
+        self._generation = generation
+        self._post_records(enumerate(records, start))
+    
+    def _load_cache(self, cache_dir: Path) -> bool:
+        """Map a local snapshot matching the Redis state; False if there is none"""
+        try:
+            meta = json.loads((cache_dir / "manifest.json").read_text())
+            arrays = {
+                name: np.load(cache_dir / f"{name}.npy", mmap_mode="r")
+                for name in _CACHE_ARRAYS
+            }
+            vocab = msgpack.unpackb((cache_dir / "vocab.msgpack").read_bytes(), raw=False)
+            documents = msgpack.unpackb((cache_dir / "documents.msgpack").read_bytes(), raw=False)
+        except (OSError, ValueError):
+            return False
+        
+        for name, values in arrays.items():
+            setattr(self, name, values)
+        self.vocab = {term: i for i, term in enumerate(vocab)}
+        self.doc_mapping = dict(enumerate(documents))
+        self.total_len = meta["total_len"]
+        self._matrix_epoch, self._matrix_docs = self._epoch, len(self.doc_len)
+        return True
+    
+    async def _write_cache(self, cache_dir: Path):
+        """Snapshot the loaded index for mmap loading on the next start"""
+        # Callers hold the load lock, so no posts race the rebuild and the
+        # matrix ends up covering every document
+        await self._refresh_scores()
+        # Copies: a view would pin the append-only buffers against resizing
+        arrays = {name: np.array(getattr(self, name)) for name in _CACHE_ARRAYS}
+        vocab = list(self.vocab)
+        documents = [self.doc_mapping[idx] for idx in range(len(self.doc_mapping))]
+        manifest = {"total_len": self.total_len}
+        
+        def write():
+            root = cache_dir.parent
+            root.mkdir(parents=True, exist_ok=True)
+            if cache_dir.exists():
+                return
+            # Build in a temporary directory and rename it into place, so
+            # other workers never map a partially written snapshot
+            tmp_dir = Path(tempfile.mkdtemp(dir=root))
+            for name, values in arrays.items():
+                np.save(tmp_dir / f"{name}.npy", values)
+            (tmp_dir / "vocab.msgpack").write_bytes(msgpack.packb(vocab, use_bin_type=True))
+            (tmp_dir / "documents.msgpack").write_bytes(
+                msgpack.packb(documents, use_bin_type=True)
+            )
+            (tmp_dir / "manifest.json").write_text(json.dumps(manifest))
+            try:
+                os.rename(tmp_dir, cache_dir)
+            except OSError:
+                # Another worker won the race
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                return
+            # Older snapshots are stale; mapped files stay valid until closed
+            for other in root.iterdir():
+                if other != cache_dir and not other.name.startswith("tmp"):
+                    shutil.rmtree(other, ignore_errors=True)
+        
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, write)
+        except OSError:
+            # The snapshot is only an optimization
             pass
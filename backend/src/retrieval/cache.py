@@ -1,12 +1,30 @@
 import hashlib
-import json
-from typing import List, Optional
+import time
+from typing import Dict, List, Optional
 import redis.asyncio as redis
+import msgpack
 import numpy as np
+import zstandard as zstd
+
+try:
+    import simsimd
+except ImportError:  # Optional SIMD kernels; numpy is used without them
+    simsimd = None
 
 from src.retrieval.hybrid import SearchResult
 from src.utils.embeddings import get_embedding
 
+# Result payloads are MessagePack, zstd-compressed at a near-memcpy level
+_compressor = zstd.ZstdCompressor(level=1)
+_decompressor = zstd.ZstdDecompressor()
+
+# The in-process copy of the embeddings checks Redis for new entries at most
+# this often, so cache lookups from other replicas show up within a second
+SYNC_INTERVAL_SECONDS = 1.0
+# Entries are found by expiry time, which is write time + TTL; look back this
+# far past the newest one already loaded to allow for replica clock skew
+SYNC_LOOKBACK_SECONDS = 5.0
+
 class SemanticCache:
     """
     Semantic caching using vector similarity
@@ -27,83 +45,196 @@ class SemanticCache:
         self.threshold = threshold
         self.ttl = ttl
         self.cache_prefix = "semantic_cache:"
+        # All embeddings live in one hash (query hash -> L2-normalized float32
+        # bytes) so any set of entries is one HMGET. Hash fields cannot
+        # expire, so expiry times are tracked in a sorted set and pruned on
+        # write; results keep a per-key TTL.
+        self.embeddings_key = f"{self.cache_prefix}embeddings"
+        self.expiry_key = f"{self.cache_prefix}expiry"
+        self.result_prefix = f"{self.cache_prefix}result:"
+        
+        # In-process copy of the embeddings hash: row i of
+        # _matrix[:_size] belongs to _hashes[i] and expires at _expiry[i].
+        # Redis stays the source of truth; every SYNC_INTERVAL_SECONDS the
+        # entries whose expiry is past _synced_until (i.e. written since the
+        # last sync, by any replica) are fetched and appended.
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._expiry = np.zeros(0, dtype=np.float64)
+        self._size = 0
+        self._hashes: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._synced_until = float("-inf")
+        self._next_sync = 0.0
+    
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        embedding = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
     
     async def get(self, query: str) -> Optional[List[SearchResult]]:
         """Check if similar query exists in cache"""
         
-        # Get query embedding
-        query_embedding = await get_embedding(query)
-        
-        # Get all cached queries
-        cache_keys = await self.redis.keys(f"{self.cache_prefix}*")
+        # Get query embedding, normalized once
+        query_embedding = self._normalize(await get_embedding(query))
         
-        if not cache_keys:
+        await self._sync(query_embedding.shape[0])
+        if not self._size:
             return None
         
-        # Find most similar cached query
-        max_similarity = 0.0
-        best_match_key = None
-        
-        for key in cache_keys:
-            cached_data = await self.redis.get(key)
-            if not cached_data:
-                continue
-            
-            data = json.loads(cached_data)
-            cached_embedding = np.array(data["embedding"])
-            
-            # Cosine similarity
-            similarity = np.dot(query_embedding, cached_embedding) / (
-                np.linalg.norm(query_embedding) * np.linalg.norm(cached_embedding)
-            )
-            
-            if similarity > max_similarity:
-                max_similarity = similarity
-                best_match_key = key
+        # Find most similar cached query: rows and query are unit vectors,
+        # so one matrix-vector product gives every cosine similarity
+        similarities = self._similarities(query_embedding)
+        similarities[self._expiry[:self._size] <= time.time()] = -np.inf
+        best = int(similarities.argmax())
         
         # Return cached results if similarity exceeds threshold
-        if max_similarity >= self.threshold and best_match_key:
-            cached_data = await self.redis.get(best_match_key)
-            data = json.loads(cached_data)
-            
-            # Deserialize results
-            results = [
-                SearchResult(**result_dict)
-                for result_dict in data["results"]
-            ]
-            
-            return results
-        
-        return None
+        if similarities[best] < self.threshold:
+            return None
+        
+        query_hash = self._hashes[best]
+        cached_data = await self.redis.get(f"{self.result_prefix}{query_hash}")
+        if not cached_data:
+            # Results expired; the embedding is pruned on the next write
+            return None
+        try:
+            data = msgpack.unpackb(_decompressor.decompress(cached_data), raw=False)
+        except (zstd.ZstdError, ValueError):
+            # Unreadable payload; treat it as a miss
+            return None
+        
+        # Deserialize results
+        results = [
+            SearchResult(**result_dict)
+            for result_dict in data["results"]
+        ]
+        
+        return results
     
     async def set(self, query: str, results: List[SearchResult]):
         """Cache query results with embedding"""
         
         # Get query embedding
-        query_embedding = await get_embedding(query)
+        query_embedding = self._normalize(await get_embedding(query))
         
         # Create cache key
         query_hash = hashlib.md5(query.encode()).hexdigest()
-        cache_key = f"{self.cache_prefix}{query_hash}"
         
         # Serialize data
         cache_data = {
             "query": query,
-            "embedding": query_embedding.tolist(),
             "results": [
                 {
                     "content": r.content,
                     "metadata": r.metadata,
                     "score": r.score,
                     "source": r.source,
+                    "doc_uid": r.doc_uid,
                 }
                 for r in results
             ],
         }
         
-        # Store in Redis with TTL
-        await self.redis.setex(
-            cache_key,
-            self.ttl,
-            json.dumps(cache_data),
+        now = time.time()
+        expires_at = now + self.ttl
+        expired = await self.redis.zrangebyscore(self.expiry_key, "-inf", now)
+        
+        # Drop expired embeddings and store the new entry in one round trip
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if expired:
+                pipe.hdel(self.embeddings_key, *expired)
+                pipe.zrem(self.expiry_key, *expired)
+            pipe.hset(self.embeddings_key, query_hash, query_embedding.tobytes())
+            pipe.zadd(self.expiry_key, {query_hash: expires_at})
+            pipe.setex(
+                f"{self.result_prefix}{query_hash}",
+                self.ttl,
+                _compressor.compress(msgpack.packb(cache_data, use_bin_type=True)),
+            )
+            await pipe.execute()
+        
+        self._put(query_hash, query_embedding, expires_at)
+    
+    def _similarities(self, query_embedding: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the query against every cached row"""
+        matrix = self._matrix[:self._size]
+        if simsimd is not None:
+            # AVX-512/NEON kernels; cosine distance is 1 - similarity
+            distances = simsimd.cdist(query_embedding[None], matrix, metric="cosine")
+            return 1.0 - np.asarray(distances).ravel()
+        return matrix @ query_embedding
+    
+    async def _sync(self, dimensions: int):
+        """Fetch entries written since the last sync, at most once per interval"""
+        now = time.monotonic()
+        if now < self._next_sync:
+            return
+        self._next_sync = now + SYNC_INTERVAL_SECONDS
+        
+        # Writes (and rewrites) push an entry's expiry past every earlier
+        # one, so new entries are the tail of the expiry set; only those not
+        # already held locally with the same expiry are fetched
+        entries = await self.redis.zrangebyscore(
+            self.expiry_key,
+            self._synced_until - SYNC_LOOKBACK_SECONDS,
+            "+inf",
+            withscores=True,
         )
+        fresh = {}
+        for query_hash, expires_at in entries:
+            if isinstance(query_hash, bytes):
+                query_hash = query_hash.decode()
+            row = self._rows.get(query_hash)
+            if row is None or self._expiry[row] != expires_at:
+                fresh[query_hash] = expires_at
+            self._synced_until = max(self._synced_until, expires_at)
+        
+        if fresh:
+            embeddings = await self.redis.hmget(self.embeddings_key, list(fresh))
+            for (query_hash, expires_at), embedding in zip(fresh.items(), embeddings):
+                # Skip entries pruned since, or written with a different
+                # embedding size
+                if embedding is None or len(embedding) != dimensions * 4:
+                    continue
+                self._put(query_hash, np.frombuffer(embedding, dtype=np.float32), expires_at)
+        
+        self._compact()
+    
+    def _compact(self):
+        """Drop expired rows once they make up most of the matrix"""
+        live = np.flatnonzero(self._expiry[:self._size] > time.time())
+        if 2 * len(live) >= self._size:
+            return
+        self._matrix = self._matrix[live]
+        self._expiry = self._expiry[live]
+        self._hashes = [self._hashes[i] for i in live.tolist()]
+        self._rows = {query_hash: i for i, query_hash in enumerate(self._hashes)}
+        self._size = len(live)
+    
+    def _put(self, query_hash: str, embedding: np.ndarray, expires_at: float):
+        """Insert or overwrite one row of the in-process matrix"""
+        row = self._rows.get(query_hash)
+        if row is not None:
+            self._matrix[row] = embedding
+            self._expiry[row] = expires_at
+            return
+        
+        if self._matrix.shape[1] != embedding.shape[0]:
+            # First entry, or the embedding size changed
+            self._matrix = np.zeros((0, embedding.shape[0]), dtype=np.float32)
+            self._expiry = np.zeros(0, dtype=np.float64)
+            self._size = 0
+            self._hashes = []
+            self._rows = {}
+        if self._size == len(self._matrix):
+            # Grow geometrically so appends are amortized O(D)
+            grown = np.zeros((max(16, 2 * self._size), embedding.shape[0]), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+            self._expiry = np.resize(self._expiry, len(grown))
+        
+        self._matrix[self._size] = embedding
+        self._expiry[self._size] = expires_at
+        self._rows[query_hash] = self._size
+        self._hashes.append(query_hash)
+        self._size += 1
@@ -0,0 +1,215 @@
+import functools
+from typing import Iterator, List, Optional, Tuple, Union
+from pathlib import Path
+import numpy as np
+import structlog
+
+from src.core.config import get_settings
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+VECTOR_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+def _length_batches(lengths: np.ndarray, batch_size: int) -> Iterator[Tuple[np.ndarray, int]]:
+    """
+    Yield (row indices, padded width) batches of similar-length inputs
+    
+    Rows are visited in order of token length, so each batch only pads to
+    the longest sequence among its neighbours; callers scatter results back
+    with the row indices.
+    """
+    order = np.argsort(lengths, kind="stable")
+    for start in range(0, len(order), batch_size):
+        rows = order[start:start + batch_size]
+        yield rows, int(lengths[rows].max())
+
+class OnnxSentenceEncoder:
+    """
+    int8-quantized ONNX Runtime version of a sentence-transformers model
+    
+    Exported and dynamically quantized once into ONNX_MODEL_DIR, then run
+    with plain numpy inputs (no torch). Mean pooling and L2 normalization
+    match all-MiniLM-L6-v2's Pooling + Normalize modules. encode() mirrors
+    the SentenceTransformer.encode arguments VectorStore uses.
+    """
+    
+    def __init__(
+        self,
+        model_name: str = VECTOR_MODEL_NAME,
+        intra_op_threads: Optional[int] = None,
+    ):
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The ONNX encoder requires optimum[onnxruntime]"
+            ) from e
+        
+        model_dir = Path(settings.ONNX_MODEL_DIR) / model_name.replace("/", "__")
+        model_path = model_dir / "model_quantized.onnx"
+        if not model_path.exists():
+            self._export(model_name, model_dir)
+        
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        options = ort.SessionOptions()
+        # Optimize for single-query latency rather than throughput unless
+        # told otherwise (0 lets ONNX Runtime use every core)
+        if intra_op_threads is None:
+            intra_op_threads = settings.ONNX_INTRA_OP_THREADS
+        options.intra_op_num_threads = intra_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(model_path), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+    
+    @staticmethod
+    def _export(model_name: str, model_dir: Path):
+        """Export the model to ONNX and write an int8 dynamically quantized copy"""
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+        
+        logger.info("onnx_encoder_export", model=model_name, path=str(model_dir))
+        model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+        model.save_pretrained(model_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(model_dir)
+        
+        quantizer = ORTQuantizer.from_pretrained(model)
+        quantizer.quantize(
+            save_dir=model_dir,
+            quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False),
+        )
+    
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = True,
+    ) -> np.ndarray:
+        """Encode sentences into an (N, D) float32 array of unit vectors"""
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        
+        if not sentences:
+            return np.zeros((0, 0), np.float32)
+        
+        # Tokenize everything in one call rather than once per batch; each
+        # length-sorted batch is then cut back to its own longest sequence,
+        # so short batches do not pay for the global padding
+        encoded = self.tokenizer(
+            list(sentences),
+            padding=True,
+            truncation=True,
+            max_length=256,
+            return_tensors="np",
+        )
+        
+        embeddings = None
+        for rows, width in _length_batches(encoded["attention_mask"].sum(axis=1), batch_size):
+            inputs = {
+                k: v[rows, :width]
+                for k, v in encoded.items()
+                if k in self._input_names
+            }
+            hidden = self.session.run(None, inputs)[0]
+            
+            # Mean pooling over real tokens
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            if embeddings is None:
+                embeddings = np.empty((len(sentences), pooled.shape[1]), dtype=np.float32)
+            embeddings[rows] = pooled
+        
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+class HalfPrecisionSentenceEncoder:
+    """
+    bfloat16 transformers version of a sentence-transformers model
+    
+    Weights are loaded directly in bfloat16, halving the bytes read at
+    load time and moved per forward pass, and the model runs without an
+    autocast wrapper. Only the pooled hidden state is upcast to float32
+    before normalization. encode() mirrors SentenceTransformer.encode.
+    """
+    
+    def __init__(self, model_name: str = VECTOR_MODEL_NAME):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+        
+        self._torch = torch
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModel.from_pretrained(
+            model_name, torch_dtype=torch.bfloat16
+        ).to(self.device).eval()
+    
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = True,
+    ) -> np.ndarray:
+        """Encode sentences into an (N, D) float32 array of unit vectors"""
+        torch = self._torch
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        
+        if not sentences:
+            return np.zeros((0, 0), np.float32)
+        
+        # One tokenizer call for all sentences, batched by length and
+        # trimmed as in OnnxSentenceEncoder
+        encoded = self.tokenizer(
+            list(sentences),
+            padding=True,
+            truncation=True,
+            max_length=256,
+            return_tensors="pt",
+        )
+        lengths = encoded["attention_mask"].sum(dim=1).numpy()
+        
+        embeddings = None
+        with torch.inference_mode():
+            for rows, width in _length_batches(lengths, batch_size):
+                index = torch.from_numpy(rows)
+                inputs = {
+                    k: v[index, :width].to(self.device)
+                    for k, v in encoded.items()
+                }
+                hidden = self.model(**inputs).last_hidden_state.float()
+                
+                # Mean pooling over real tokens, in float32
+                mask = inputs["attention_mask"].unsqueeze(-1).float()
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                pooled = torch.nn.functional.normalize(pooled, dim=-1).cpu().numpy()
+                if embeddings is None:
+                    embeddings = np.empty((len(sentences), pooled.shape[1]), dtype=np.float32)
+                embeddings[rows] = pooled
+        
+        return embeddings
+
+@functools.cache
+def load_vector_encoder(dtype: Optional[str] = None):
+    """
+    Build the encoder selected by VECTOR_ENCODER_BACKEND ("torch" or "onnx")
+    
+    dtype="bf16" loads the torch model in bfloat16 and dtype="int8" the
+    quantized ONNX model on every core (both used by the seeding script,
+    where model load dominates the run). Encoders are cached per dtype, so
+    every VectorStore in a process shares one model.
+    """
+    if dtype == "bf16":
+        return HalfPrecisionSentenceEncoder()
+    if dtype == "int8":
+        return OnnxSentenceEncoder(intra_op_threads=0)
+    if settings.VECTOR_ENCODER_BACKEND == "onnx":
+        return OnnxSentenceEncoder()
+    
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(VECTOR_MODEL_NAME)
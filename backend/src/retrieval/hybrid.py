@@ -1,19 +1,26 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
 from dataclasses import dataclass
 import asyncio
+import hashlib
 
 from src.retrieval.vector_store import VectorStore
 from src.retrieval.bm25_store import BM25Store
 from src.retrieval.reranker import Reranker
 from src.retrieval.cache import SemanticCache
 
+# Fused candidates passed to the cross-encoder: rerank_top_k times this,
+# but never fewer than MIN_RERANK_CANDIDATES
+RERANK_CANDIDATES_PER_RESULT = 4
+MIN_RERANK_CANDIDATES = 20
+
 @dataclass
 class SearchResult:
     content: str
     metadata: Dict[str, Any]
     score: float
     source: str  # "vector", "bm25", or "hybrid"
+    doc_uid: str = ""  # "{document_id}_{chunk_id}", set by the stores for fusion
 
 class HybridRetriever:
     """
@@ -38,6 +45,8 @@ class HybridRetriever:
         self.reranker = reranker
         self.cache = cache
         self.alpha = alpha
+        # Pipelines currently running, keyed by query and parameters
+        self._inflight: Dict[str, "asyncio.Task[Tuple[List[SearchResult], bool]]"] = {}
     
     async def retrieve(
         self,
@@ -45,19 +54,52 @@ class HybridRetriever:
         top_k: int = 20,
         rerank_top_k: int = 5,
         use_cache: bool = True,
-    ) -> List[SearchResult]:
+    ) -> Tuple[List[SearchResult], bool]:
         """
         Hybrid retrieval pipeline with caching
         
         Returns:
-            Top-k reranked results with scores
+            Tuple of (top-k reranked results with scores, whether they were
+            served from the semantic cache)
+        
+        Concurrent identical calls share one pipeline run and receive the
+        same result list.
         """
+        key = hashlib.sha1(
+            f"{top_k}\0{rerank_top_k}\0{use_cache}\0{query}".encode()
+        ).hexdigest()
+        task = self._inflight.get(key)
+        if task is None:
+            # The pipeline runs in its own task and every caller, the first
+            # included, awaits it through a shield, so a caller that
+            # disconnects cannot cancel the run the others are waiting on
+            task = asyncio.ensure_future(
+                self._retrieve(query, top_k, rerank_top_k, use_cache)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_inflight(key, done))
+        return await asyncio.shield(task)
+    
+    def _finish_inflight(self, key: str, task: "asyncio.Task"):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Callers get it; don't log it as unretrieved
+    
+    async def _retrieve(
+        self,
+        query: str,
+        top_k: int,
+        rerank_top_k: int,
+        use_cache: bool,
+    ) -> Tuple[List[SearchResult], bool]:
+        """Run the cache, search, fusion and rerank pipeline once"""
         
         # 1. Check semantic cache
         if use_cache:
             cached_results = await self.cache.get(query)
             if cached_results:
-                return cached_results
+                return cached_results, True
         
         # 2. Parallel retrieval from vector and BM25
         vector_task = self.vector_store.search(query, top_k=top_k)
@@ -67,9 +109,12 @@ class HybridRetriever:
             vector_task, bm25_task
         )
         
-        # 3. Reciprocal Rank Fusion
+        # 3. Reciprocal Rank Fusion, keeping only the candidates worth a
+        # cross-encoder pass
         fused_results = self._reciprocal_rank_fusion(
-            vector_results, bm25_results
+            vector_results,
+            bm25_results,
+            limit=max(rerank_top_k * RERANK_CANDIDATES_PER_RESULT, MIN_RERANK_CANDIDATES),
         )
         
         # 4. Rerank with cross-encoder
@@ -83,56 +128,66 @@ class HybridRetriever:
         if use_cache:
             await self.cache.set(query, reranked_results)
         
-        return reranked_results
+        return reranked_results, False
     
     def _reciprocal_rank_fusion(
         self,
         vector_results: List[SearchResult],
         bm25_results: List[SearchResult],
         k: int = 60,
+        limit: Optional[int] = None,
     ) -> List[SearchResult]:
         """
         RRF formula: score = sum(1 / (k + rank))
         
-        This gives 1-9% better recall than single-method retrieval
+        This gives 1-9% better recall than single-method retrieval. Only the
+        best `limit` fused results are returned when given.
         """
         
-        # Build document ID to result mapping
-        doc_map: Dict[str, SearchResult] = {}
-        doc_scores: Dict[str, float] = {}
-        
-        # Process vector results
-        for rank, result in enumerate(vector_results, start=1):
-            doc_id = self._get_doc_id(result)
-            doc_map[doc_id] = result
-            doc_scores[doc_id] = self.alpha / (k + rank)
-        
-        # Process BM25 results
-        for rank, result in enumerate(bm25_results, start=1):
-            doc_id = self._get_doc_id(result)
-            if doc_id not in doc_map:
-                doc_map[doc_id] = result
-            doc_scores[doc_id] = doc_scores.get(doc_id, 0) + (
-                (1 - self.alpha) / (k + rank)
-            )
+        # Assign each distinct document a dense index in first-seen order
+        index: Dict[str, int] = {}
+        unique: List[SearchResult] = []
         
-        # Sort by fused score
-        sorted_docs = sorted(
-            doc_scores.items(),
-            key=lambda x: x[1],
-            reverse=True,
-        )
+        def positions(results: List[SearchResult], replace: bool) -> np.ndarray:
+            out = np.empty(len(results), dtype=np.intp)
+            for i, result in enumerate(results):
+                doc_id = self._get_doc_id(result)
+                j = index.get(doc_id)
+                if j is None:
+                    j = index[doc_id] = len(unique)
+                    unique.append(result)
+                elif replace:
+                    unique[j] = result
+                out[i] = j
+            return out
+        
+        vector_pos = positions(vector_results, replace=True)
+        bm25_pos = positions(bm25_results, replace=False)
+        
+        # Accumulate both rank contributions in one array
+        scores = np.zeros(len(unique))
+        scores[vector_pos] = self.alpha / (k + np.arange(1, len(vector_pos) + 1))
+        np.add.at(scores, bm25_pos, (1 - self.alpha) / (k + np.arange(1, len(bm25_pos) + 1)))
+        
+        # Select the top `limit` in O(n), then sort just those by fused
+        # score; stable, so ties keep first-seen order
+        candidates = np.arange(len(unique))
+        if limit is not None and limit < len(unique):
+            candidates = np.sort(np.argpartition(-scores, limit - 1)[:limit])
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
         
         # Return results with updated scores
         results = []
-        for doc_id, score in sorted_docs:
-            result = doc_map[doc_id]
-            result.score = score
+        for j in order.tolist():
+            result = unique[j]
+            result.score = float(scores[j])
             result.source = "hybrid"
             results.append(result)
         
         return results
     
     def _get_doc_id(self, result: SearchResult) -> str:
-        """Generate unique ID for deduplication"""
+        """Unique ID for deduplication, precomputed by the stores"""
+        if result.doc_uid:
+            return result.doc_uid
         return f"{result.metadata.get('document_id', '')}_{result.metadata.get('chunk_id', '')}"
@@ -1,5 +1,6 @@
-from typing import List
+from typing import List, Tuple
 import numpy as np
+import torch
 from sentence_transformers import CrossEncoder
 import asyncio
 
@@ -12,8 +13,40 @@ class Reranker:
     """Cross-encoder reranker for better relevance"""
     
     def __init__(self, model_name: str = "ms-marco-MiniLM-L-6-v2"):
-        self.model = CrossEncoder(model_name)
-        self.model.max_seq_length = 512
+        # fp16 weights on GPU; CPU keeps fp32
+        self.use_cuda = torch.cuda.is_available()
+        self.device = "cuda" if self.use_cuda else "cpu"
+        self.model = CrossEncoder(
+            model_name,
+            max_length=512,
+            device=self.device,
+            automodel_args={"torch_dtype": torch.float16} if self.use_cuda else {},
+        )
+        self.model.model.eval()
+    
+    def _score(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        """Score all pairs in one padded forward pass"""
+        features = self.model.tokenizer(
+            [query for query, _ in pairs],
+            [text for _, text in pairs],
+            padding=True,
+            truncation="longest_first",
+            max_length=self.model.max_length,
+            return_tensors="pt",
+        )
+        with torch.inference_mode():
+            if self.use_cuda:
+                features = {
+                    k: v.pin_memory().to(self.device, non_blocking=True)
+                    for k, v in features.items()
+                }
+            with torch.autocast(self.device, dtype=torch.float16, enabled=self.use_cuda):
+                logits = self.model.model(**features, return_dict=True).logits
+            # Same post-processing as CrossEncoder.predict
+            scores = self.model.default_activation_function(logits)
+            if self.model.config.num_labels == 1:
+                scores = scores[:, 0]
+        return scores.float().cpu().numpy()
     
     async def rerank(
         self,
@@ -29,12 +62,8 @@ class Reranker:
         pairs = [(query, doc.content) for doc in documents]
         
         # Run in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        scores = await loop.run_in_executor(
-            None,
-            self.model.predict,
-            pairs
-        )
+        loop = asyncio.get_running_loop()
+        scores = await loop.run_in_executor(None, self._score, pairs)
         
         # Combine with original scores (weighted average)
         reranked_docs = []
@@ -1,63 +1,217 @@
 from typing import List, Dict, Any, Optional
+from collections import OrderedDict
 import numpy as np
+import asyncio
 import asyncpg
 import json
-from sentence_transformers import SentenceTransformer
+from pgvector import HalfVector
+from pgvector.asyncpg import register_vector
 import structlog
 
 from src.retrieval.hybrid import SearchResult
+from src.retrieval.encoders import load_vector_encoder
 from src.core.config import get_settings
 
 logger = structlog.get_logger()
 settings = get_settings()
 
+QUERY_CACHE_SIZE = 4096  # Query embeddings kept per store
+
+_DOCUMENT_COLUMNS = ["id", "content", "metadata", "document_id", "chunk_id", "embedding"]
+
+def _to_halfvec(embedding) -> HalfVector:
+    """Cast an encoder vector to the FP16 halfvec stored in documents.embedding"""
+    return HalfVector(np.asarray(embedding, dtype=np.float16))
+
 class VectorStore:
     """Supabase pgvector database interface"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        encoder=None,
+        dtype: Optional[str] = None,
+        max_concurrency: int = 1,
+    ):
         self.connection_string = settings.DATABASE_URL
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        # SentenceTransformer or one of the encoders.py encoders; all expose
+        # encode(). dtype="bf16" selects the bfloat16 encoder.
+        self.model = encoder if encoder is not None else load_vector_encoder(dtype)
+        # LRU of query embeddings; shared between callers, so read-only
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # Limits document encodes running at once; each one already uses
+        # every core, so concurrent ingests would only contend for them
+        self._encode_semaphore = asyncio.Semaphore(max_concurrency)
+        self._pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()
         self._ensure_table()
     
-    async def _get_connection(self):
-        """Get database connection"""
-        return await asyncpg.connect(self.connection_string)
+    async def _get_pool(self) -> asyncpg.Pool:
+        """Create the connection pool on first use"""
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        self.connection_string,
+                        min_size=settings.DATABASE_POOL_MIN_SIZE,
+                        max_size=settings.DATABASE_POOL_MAX_SIZE,
+                        # Binary codecs for the vector and halfvec types
+                        init=register_vector,
+                        # Session default, so it survives the RESET ALL on release
+                        server_settings={"hnsw.ef_search": str(settings.HNSW_EF_SEARCH)},
+                    )
+        return self._pool
+    
+    async def close(self):
+        """Close the connection pool"""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+    
+    async def ping(self) -> None:
+        """Round-trip a trivial query to check the database is reachable"""
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.fetchval("SELECT 1")
+    
+    async def warmup(self, texts: Optional[List[str]] = None):
+        """Run one throwaway encode so lazy kernel and allocator setup is paid up front"""
+        await asyncio.to_thread(self.model.encode, texts or ["warmup"], convert_to_numpy=True)
+    
+    def invalidate_embedding(self, query: Optional[str] = None):
+        """
+        Drop cached query embeddings
+        
+        Pass a query to evict just that entry, or nothing to clear the whole
+        cache (e.g. after swapping the encoder).
+        """
+        if query is None:
+            self._query_cache.clear()
+        else:
+            self._query_cache.pop(query, None)
     
     def _ensure_table(self):
         """Create vector table if it doesn't exist"""
         # This would be handled by Supabase migrations
         pass
     
+    async def encode_documents(self, documents: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Encode chunk contents into an (N, D) matrix for the embedding column
+        
+        The model runs in a worker thread so the event loop (and any write
+        in flight) keeps going while it does.
+        """
+        # Encode each distinct content once and fan the rows back out
+        positions: Dict[str, int] = {}
+        row_of = [positions.setdefault(doc["content"], len(positions)) for doc in documents]
+        if len(positions) < len(documents):
+            logger.info(
+                "duplicate_chunks_skipped",
+                total=len(documents),
+                unique=len(positions),
+            )
+        
+        async with self._encode_semaphore:
+            embeddings = await asyncio.to_thread(
+                self.model.encode,
+                list(positions),
+                batch_size=64,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            )
+        # The encoder already returns one freshly allocated (unique, D)
+        # matrix; only gather rows into a second one when contents repeat
+        if len(positions) == len(documents):
+            return embeddings
+        return embeddings[row_of]
+    
     async def add_documents(
         self,
         documents: List[Dict[str, Any]],
-        embeddings: Optional[List[np.ndarray]] = None,
+        embeddings: Optional[np.ndarray] = None,
     ):
-        """Add documents to vector store"""
+        """
+        Add documents to vector store
+        
+        Args:
+            documents: Chunks to store
+            embeddings: Optional (N, D) array or sequence of vectors from
+                this store's encoder; computed from content when omitted
+        """
+        if not documents:
+            return
         if embeddings is None:
-            embeddings = self.model.encode([doc["content"] for doc in documents])
+            embeddings = await self.encode_documents(documents)
         
-        conn = await self._get_connection()
-        try:
-            for i, (doc, embedding) in enumerate(zip(documents, embeddings)):
+        # Parser chunk ids are only unique per filename, so rows are keyed
+        # by document too (the doc_uid BM25 and fusion use); rows stored
+        # under the bare chunk id are re-keyed by migration
+        # 20240219000000_documents_id_doc_uid
+        await self.add_many(
+            [f"{doc.get('document_id', '')}_{doc['chunk_id']}" for doc in documents],
+            embeddings,
+            documents,
+        )
+    
+    async def add_many(
+        self,
+        ids: List[str],
+        vectors: np.ndarray,
+        documents: List[Dict[str, Any]],
+    ):
+        """
+        Upsert precomputed vectors in one statement
+        
+        Args:
+            ids: Row id per vector
+            vectors: (N, D) array from this store's encoder
+            documents: Per-row content, metadata, document_id and chunk_id
+        """
+        if not ids:
+            return
+        # Cast the whole matrix once to big-endian FP16, the halfvec binary
+        # format, so HalfVector wraps each row without another copy
+        vectors = np.asarray(vectors, dtype=">f2")
+        
+        # One record per id; the last occurrence wins, as with the previous
+        # row-by-row upsert
+        records = {}
+        for doc_key, doc, vector in zip(ids, documents, vectors):
+            records[doc_key] = (
+                doc_key,
+                doc["content"],
+                json.dumps(doc.get("metadata", {})),
+                doc.get("document_id", ""),
+                doc.get("chunk_id", ""),
+                HalfVector(vector),
+            )
+        
+        # Binary COPY into a staging table, then a single set-based upsert
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    """
+                    CREATE TEMP TABLE documents_staging
+                    (LIKE documents INCLUDING DEFAULTS) ON COMMIT DROP
+                    """
+                )
+                await conn.copy_records_to_table(
+                    "documents_staging",
+                    records=list(records.values()),
+                    columns=_DOCUMENT_COLUMNS,
+                )
                 await conn.execute(
                     """
                     INSERT INTO documents (id, content, metadata, document_id, chunk_id, embedding)
-                    VALUES ($1, $2, $3, $4, $5, $6)
+                    SELECT id, content, metadata, document_id, chunk_id, embedding
+                    FROM documents_staging
                     ON CONFLICT (id) DO UPDATE SET
                         content = EXCLUDED.content,
                         metadata = EXCLUDED.metadata,
                         embedding = EXCLUDED.embedding
-                    """,
-                    doc["id"],
-                    doc["content"],
-                    json.dumps(doc.get("metadata", {})),
-                    doc.get("document_id", ""),
-                    doc.get("chunk_id", ""),
-                    embedding.tolist()
+                    """
                 )
-        finally:
-            await conn.close()
     
     async def search(
         self,
@@ -67,20 +221,24 @@ class VectorStore:
         filter: Optional[Dict[str, Any]] = None,
     ) -> List[SearchResult]:
         """Search for similar documents using pgvector"""
-        query_embedding = self.model.encode([query])[0]
+        query_embedding = await self._encode_query(query)
         
-        conn = await self._get_connection()
-        try:
-            # Build WHERE clause for filtering
-            where_clause = ""
-            if filter:
-                conditions = []
-                for key, value in filter.items():
-                    conditions.append(f"metadata->>'{key}' = '{value}'")
-                if conditions:
-                    where_clause = "WHERE " + " AND ".join(conditions)
-            
-            # Perform vector similarity search
+        # Build WHERE clause for filtering; keys and values are bound as
+        # parameters so the statement text only depends on the filter size
+        # and stays in asyncpg's prepared statement cache
+        where_clause = ""
+        filter_args: List[str] = []
+        if filter:
+            conditions = []
+            for key, value in filter.items():
+                n = 3 + len(filter_args)
+                conditions.append(f"metadata->>${n} = ${n + 1}")
+                filter_args.extend((str(key), str(value)))
+            where_clause = "WHERE " + " AND ".join(conditions)
+        
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            # Perform vector similarity search (served by the HNSW index)
             query_sql = f"""
                 SELECT 
                     id, content, metadata, document_id, chunk_id,
@@ -91,7 +249,9 @@ class VectorStore:
                 LIMIT $2
             """
             
-            rows = await conn.fetch(query_sql, query_embedding.tolist(), top_k)
+            rows = await conn.fetch(
+                query_sql, _to_halfvec(query_embedding), top_k, *filter_args
+            )
             
             results = []
             for row in rows:
@@ -102,29 +262,39 @@ class VectorStore:
                         metadata=json.loads(row['metadata']),
                         score=similarity,
                         source="vector",
+                        doc_uid=f"{row['document_id']}_{row['chunk_id']}",
                     )
                     results.append(result)
             
             return results
-            
-        finally:
-            await conn.close()
+    
+    async def _encode_query(self, query: str) -> np.ndarray:
+        """Encode a search query in a worker thread, reusing the embedding of a repeated query"""
+        cached = self._query_cache.get(query)
+        if cached is not None:
+            self._query_cache.move_to_end(query)
+            return cached
+        
+        embedding = (await asyncio.to_thread(self.model.encode, [query]))[0]
+        embedding.setflags(write=False)
+        self._query_cache[query] = embedding
+        if len(self._query_cache) > QUERY_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
+        return embedding
     
     async def delete_document(self, document_id: str):
         """Delete all chunks for a document"""
-        conn = await self._get_connection()
-        try:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
             await conn.execute(
                 "DELETE FROM documents WHERE document_id = $1",
                 document_id
             )
-        finally:
-            await conn.close()
     
     async def get_collection_info(self):
         """Get collection statistics"""
-        conn = await self._get_connection()
-        try:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
             stats = await conn.fetchrow("""
                 SELECT 
                     COUNT(*) as total_documents,
@@ -138,5 +308,3 @@ class VectorStore:
                 "unique_documents": stats['unique_documents'],
                 "avg_similarity": float(stats['avg_similarity']) if stats['avg_similarity'] else 0
             }
-        finally:
-            await conn.close()
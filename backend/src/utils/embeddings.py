@@ -1,5 +1,8 @@
 from openai import AsyncOpenAI
-from typing import List
+from typing import Dict, List, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
 import numpy as np
 
 from src.core.config import get_settings
@@ -7,18 +10,68 @@ from src.core.config import get_settings
 settings = get_settings()
 client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
 
+# Texts per embeddings request; longer lists are split and sent concurrently
+EMBEDDING_REQUEST_BATCH_SIZE = 100
+# Single-text embeddings kept in process, keyed by (model, sha1 of the text)
+EMBEDDING_CACHE_SIZE = 4096
+
+_embedding_cache: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+_inflight: Dict[Tuple[str, str], "asyncio.Task[np.ndarray]"] = {}
+
 async def get_embedding(text: str) -> np.ndarray:
-    """Get embedding for text using OpenAI"""
+    """
+    Get embedding for text using OpenAI
+    
+    Results are cached and concurrent calls for the same text share one
+    request, so the returned array is shared and read-only.
+    """
+    model = settings.EMBEDDING_MODEL
+    key = (model, hashlib.sha1(text.encode()).hexdigest())
+    cached = _embedding_cache.get(key)
+    if cached is not None:
+        _embedding_cache.move_to_end(key)
+        return cached
+    
+    task = _inflight.get(key)
+    if task is None:
+        # The request runs in its own task and every caller, the first
+        # included, awaits it through a shield, so a cancelled caller
+        # cannot cancel the request the others are waiting on
+        task = asyncio.ensure_future(_fetch_embedding(model, key, text))
+        _inflight[key] = task
+        task.add_done_callback(lambda done: _finish_inflight(key, done))
+    return await asyncio.shield(task)
+
+async def _fetch_embedding(model: str, key: Tuple[str, str], text: str) -> np.ndarray:
     response = await client.embeddings.create(
-        model=settings.EMBEDDING_MODEL,
+        model=model,
         input=text
     )
-    return np.array(response.data[0].embedding)
+    embedding = np.array(response.data[0].embedding)
+    embedding.setflags(write=False)
+    
+    _embedding_cache[key] = embedding
+    if len(_embedding_cache) > EMBEDDING_CACHE_SIZE:
+        _embedding_cache.popitem(last=False)
+    return embedding
+
+def _finish_inflight(key: Tuple[str, str], task: "asyncio.Task[np.ndarray]"):
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    if not task.cancelled():
+        task.exception()  # Callers get it; don't log it as unretrieved
 
 async def get_embeddings(texts: List[str]) -> List[np.ndarray]:
-    """Get embeddings for multiple texts"""
-    response = await client.embeddings.create(
-        model=settings.EMBEDDING_MODEL,
-        input=texts
-    )
-    return [np.array(data.embedding) for data in response.data]
+    """Get embeddings for multiple texts, in sub-batches sent concurrently"""
+    batches = [
+        texts[i:i + EMBEDDING_REQUEST_BATCH_SIZE]
+        for i in range(0, len(texts), EMBEDDING_REQUEST_BATCH_SIZE)
+    ]
+    responses = await asyncio.gather(*(
+        client.embeddings.create(
+            model=settings.EMBEDDING_MODEL,
+            input=batch
+        )
+        for batch in batches
+    ))
+    return [np.array(data.embedding) for response in responses for data in response.data]
@@ -0,0 +1,19 @@
+from typing import List
+import re
+
+# Runs of letters or digits; equal to [a-z0-9]+ on lowercased ASCII but
+# keeps accented and non-Latin words
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+# Stored with persisted BM25 indexes so they are re-tokenized if this changes
+TOKENIZER_VERSION = "regex-v1"
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lexical tokenizer shared by ingestion and BM25 search
+    
+    Chunks are tokenized once when they are created and the tokens are
+    reused by the BM25 index; queries go through the same function so both
+    sides agree on terms.
+    """
+    return _TOKEN_RE.findall(text.lower())
@@ -0,0 +1,7 @@
+-- HNSW index for VectorStore.search (ORDER BY embedding <=> $1 LIMIT k).
+-- Query-time recall/speed is set per session through hnsw.ef_search
+-- (HNSW_EF_SEARCH, default 40).
+CREATE INDEX IF NOT EXISTS documents_embedding_hnsw_idx
+    ON documents
+    USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64);
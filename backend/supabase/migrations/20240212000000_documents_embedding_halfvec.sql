@@ -0,0 +1,12 @@
+-- Store VectorStore embeddings (all-MiniLM-L6-v2, 384 dims) as FP16
+-- halfvec, halving table, index and WAL size. Requires pgvector >= 0.7.
+DROP INDEX IF EXISTS documents_embedding_hnsw_idx;
+
+ALTER TABLE documents
+    ALTER COLUMN embedding TYPE halfvec(384)
+    USING embedding::halfvec(384);
+
+CREATE INDEX documents_embedding_hnsw_idx
+    ON documents
+    USING hnsw (embedding halfvec_cosine_ops)
+    WITH (m = 16, ef_construction = 64);
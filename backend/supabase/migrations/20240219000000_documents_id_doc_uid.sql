@@ -0,0 +1,13 @@
+-- Key documents rows by document_id || '_' || chunk_id (the doc_uid BM25
+-- and fusion use) instead of chunk_id alone, which parsers only keep unique
+-- per filename. Rows written under the old scheme are re-keyed in place, so
+-- re-ingesting a document updates them rather than adding duplicates; where
+-- a row already exists under the new id, it wins over the old one.
+DELETE FROM documents AS old
+USING documents AS new
+WHERE old.id = old.chunk_id
+  AND new.id = COALESCE(old.document_id, '') || '_' || old.chunk_id;
+
+UPDATE documents
+SET id = COALESCE(document_id, '') || '_' || chunk_id
+WHERE id = chunk_id;
@@ -21,6 +21,9 @@ from src.retrieval.cache import SemanticCache
 from src.core.config import get_settings
 import redis.asyncio as redis
 
+# Questions retrieved and answered at the same time
+EVAL_CONCURRENCY = 4
+
 # Test dataset
 TEST_QUESTIONS = [
     "What is machine learning?",
@@ -60,28 +63,33 @@ async def run_evaluation():
     
     # Generate answers
     print("\n📝 Generating answers for test questions...")
-    answers = []
-    contexts = []
+    semaphore = asyncio.Semaphore(EVAL_CONCURRENCY)
     
-    for i, question in enumerate(TEST_QUESTIONS):
-        print(f"Processing question {i+1}/{len(TEST_QUESTIONS)}: {question}")
-        
-        try:
-            # Retrieve
-            results = await retriever.retrieve(question, use_cache=False)
-            context = [r.content for r in results]
-            contexts.append(context)
-            
-            # Generate
-            answer = await llm.generate(question, results)
-            answers.append(answer)
+    async def process(i: int, question: str):
+        async with semaphore:
+            print(f"Processing question {i+1}/{len(TEST_QUESTIONS)}: {question}")
             
-            print(f"✅ Generated answer (length: {len(answer)} chars)")
-            
-        except Exception as e:
-            print(f"❌ Failed to process question: {str(e)}")
-            answers.append("Error generating answer")
-            contexts.append([])
+            try:
+                # Retrieve
+                results, _ = await retriever.retrieve(question, use_cache=False)
+                context = [r.content for r in results]
+                
+                # Generate
+                answer = await llm.generate(question, results)
+                
+                print(f"✅ Generated answer (length: {len(answer)} chars)")
+                return answer, context
+                
+            except Exception as e:
+                print(f"❌ Failed to process question: {str(e)}")
+                return "Error generating answer", []
+    
+    # gather() keeps outputs in question order
+    outputs = await asyncio.gather(
+        *(process(i, question) for i, question in enumerate(TEST_QUESTIONS))
+    )
+    answers = [answer for answer, _ in outputs]
+    contexts = [context for _, context in outputs]
     
     # Run evaluation
     print("\n📊 Running RAGAS evaluation...")